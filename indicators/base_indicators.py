@@ -7,22 +7,32 @@ import pandas as pd
 from pandas import Series
 
 
+def volume_index(close: Series, days: Series, start_pos: int,
+                 name: str) -> Series:
+    """
+    Index that starts at 1000 and adds the percentage change of the close
+    on the days passed, from `start_pos` on. It is computed as a cumulative
+    sum with the initial value as its first term, so the values are added
+    in the same order as they would be day by day.
+    :param close: the closing values.
+    :param days: boolean series, True for the days to add the change of.
+    :param start_pos: the first position where the index can change.
+    :param name: the name of the series returned.
+    """
+    increments = np.where(days.values, close.pct_change().values * 100., 0.)
+    increments[:start_pos] = 0.
+    if len(increments) > 0:
+        increments[0] = 1000.0
+    return pd.Series(np.cumsum(increments), index=close.index,
+                     dtype='float64', name=name)
+
+
 def positive_volume_index(close: Series, volume: Series, start_pos: int = 6):
     """
     Positive Volume Index (PVI)
     Source: https://www.equities.com/news/the-secret-to-the-positive-volume-index
     """
-    pvi = pd.Series(index=close.index, dtype='float64', name='pvi')
-    pvi.iloc[:] = 1000.0
-    price_chg = close.pct_change()
-    vol_change = volume.pct_change()
-    for i in range(start_pos, len(pvi)):
-        if vol_change.iloc[i] > 0:
-            pvi.iloc[i] = pvi.iloc[i - 1] + (
-                    price_chg.iloc[i] * 100.)
-        else:
-            pvi.iloc[i] = pvi.iloc[i - 1]
-    return pvi
+    return volume_index(close, volume.pct_change() > 0, start_pos, 'pvi')
 
 
 def negative_volume_index(close: Series, volume: Series, start_pos: int = 1):
@@ -30,17 +40,7 @@ def negative_volume_index(close: Series, volume: Series, start_pos: int = 1):
     Negative Volume Index (PVI)
     Source: https://www.equities.com/news/the-secret-to-the-positive-volume-index
     """
-    nvi = pd.Series(index=close.index, dtype='float64', name='nvi')
-    nvi.iloc[:] = 1000.0
-    price_chg = close.pct_change()
-    vol_change = volume.pct_change()
-    for i in range(start_pos, len(nvi)):
-        if vol_change.iloc[i] < 0:
-            nvi.iloc[i] = nvi.iloc[i - 1] + (
-                    price_chg.iloc[i] * 100.)
-        else:
-            nvi.iloc[i] = nvi.iloc[i - 1]
-    return nvi
+    return volume_index(close, volume.pct_change() < 0, start_pos, 'nvi')
 
 
 def ewma(data, alpha, offset=None, dtype=None) -> Series:
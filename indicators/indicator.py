@@ -107,19 +107,30 @@ class Indicator:
             index=False)
         return fused, scaler_saved
 
-    def register(self):
+    def today_values(self, scaler=None) -> pd.Series:
         """
-        Scales the indicator values and save them to the specified filename
-        :return: N/A
+        Scales the indicator values and returns the last one.
+        :param scaler: the scaler to use. If None, it is loaded from the
+            scaler file in params.
+        :return: the scaled values of the indicator columns for the last row
         """
-        scaler = joblib.load(self.params.scaler_name)
-        self.log.info('Scaler loaded: {}'.format(self.params.scaler_name))
+        if scaler is None:
+            scaler = joblib.load(self.params.scaler_name)
+            self.log.info('Scaler loaded: {}'.format(self.params.scaler_name))
         ix_scaled = scaler.transform(self.values[self.ix_columns])
         last_row = np.array([[ix_scaled[-1, 0]], [ix_scaled[-1, 1]]])
         ix_row = pd.DataFrame(data=last_row.T,
                               columns=self.ix_columns,
                               index=None)
-        ix_row.iloc[0].to_json(self.params.json_indicator.format(self.name))
+        return ix_row.iloc[0]
+
+    def register(self):
+        """
+        Scales the indicator values and save them to the specified filename
+        :return: N/A
+        """
+        self.today_values().to_json(
+            self.params.json_indicator.format(self.name))
         self.log.info(
             'Saved indicators to: {}'.format(
                 self.params.json_indicator.format(self.name)))
@@ -0,0 +1,459 @@
+"""
+Main pipeline to predict the action to be taken today on a given stock, run
+in a single Python process. It follows the same sequence as `pipeline.sh`:
+retrieve the latest OHLCV values, update the predictions file, predict the
+closing with each network, compute the ensemble and the indicators, update
+the forecast file, and produce the trading recommendation.
+
+Parameters, networks, encoders, scaler and RL policy are loaded once, and
+the result of each stage is handed to the next one in memory, instead of
+through the temporary JSON files. The only exception is the latest
+predictions, needed by the next day's run: they are kept in memory, but
+also saved to their JSON file, so that a restarted pipeline (or
+`pipeline.sh`) can still update the predictions file.
+
+With `--daemon HH:MM`, the process stays alive and runs the pipeline every
+day at that time, keeping everything resident between runs.
+
+With `--server`, the predictions are requested to the prediction server
+(`predictor.py serve`, at the `server` set in the predictor configuration),
+which keeps the networks loaded, instead of loading them in this process.
+
+    python pipeline.py -s SYMBOL [-c CONFIG_FILE] [-n] [--daemon HH:MM]
+                       [--server]
+
+With `--batch BATCH_FILE`, the pipeline runs for every symbol listed in the
+batch file (YAML), over a pool of `workers` processes. The predictor
+networks are shared by all the symbols run by a process that use the same
+configuration file, and the recommendations for all symbols are written to a
+single `report` file (CSV):
+
+    workers: 4
+    report: ../output/recommendations.csv
+    symbols:
+      ^GDAXI:
+        staging: ../staging/^GDAXI
+      ANA.MC:
+        staging: ../staging/ANA.MC
+        config: params_ana.yaml     # optional, default is -c value
+        retrieve: false             # optional, default is not -n
+
+    python pipeline.py --batch BATCH_FILE [-c CONFIG_FILE] [-n] [--server]
+
+(c) J. Renero
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from importlib import import_module
+from multiprocessing import Pool
+from os.path import abspath, dirname, join, realpath
+
+import joblib
+import pandas as pd
+
+from utils.dictionary import Dictionary
+from utils.file_io import read_json
+from utils.logger import Logger
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+ROOT_DIR = dirname(realpath(__file__))
+
+# Predictor networks and encoders loaded in this process, by configuration
+# file, shared by the pipelines of all the symbols using the same one.
+predictor_models = {}
+
+
+@contextmanager
+def stage(name: str, *argv):
+    """
+    Run within the directory of a stage, as `pipeline.sh` does, since paths
+    in configuration files are relative to it. Every stage has its own
+    `arguments` module, and the parameters classes import it by that name,
+    so the one from this stage is set in place, along with the command line
+    arguments passed, before building them.
+    :param name: the name of the stage (and its directory)
+    :param argv: the command line arguments for the stage
+    """
+    cwd, sys_argv = os.getcwd(), sys.argv
+    os.chdir(join(ROOT_DIR, name))
+    sys.argv = ['{}.py'.format(name)] + list(argv)
+    sys.modules['arguments'] = import_module('{}.arguments'.format(name))
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+        sys.argv = sys_argv
+
+
+class Pipeline:
+    """
+    The daily pipeline for a symbol, with all the artifacts it needs loaded
+    and kept in memory between runs.
+    """
+
+    def __init__(self,
+                 symbol: str,
+                 config_file: str = 'params.yaml',
+                 retrieve: bool = True,
+                 staging_dir: str = None,
+                 log_level: int = 3,
+                 server: bool = False):
+        """
+        :param symbol: the acronym of the stock.
+        :param config_file: the name of the configuration file in each stage
+            directory (same name for all of them).
+        :param retrieve: whether to retrieve the latest OHLCV values from the
+            provider, or to read them from the temporary OHLC file.
+        :param staging_dir: the directory with the data and models of the
+            symbol. Default is `staging/SYMBOL`.
+        :param log_level: the level of the pipeline log.
+        :param server: whether to get the predictions from the prediction
+            server, instead of loading the networks.
+        """
+        self.symbol = symbol
+        self.config_file = config_file
+        self.retrieve = retrieve
+        self.server = server
+        self.log = Logger(log_level)
+
+        staging = staging_dir if staging_dir is not None else join(
+            ROOT_DIR, 'staging', symbol)
+        self.ohlc_file = join(staging, 'ohlcv.csv')
+        self.preds_file = join(staging, 'predictions.csv')
+        self.forecast_file = join(staging, 'forecast.csv')
+        self.rl_model = join(staging, 'rl_model')
+        self.portfolio = join(staging, 'portfolio.json')
+        self.scaler_file = join(staging, 'scaler.pickle')
+
+        # Latest predictions from the networks, and the RL strategy.
+        self.predictions = None
+        self.strategy = None
+        self.load()
+
+    def load(self):
+        """ Build the parameters of every stage, and load their artifacts """
+        config = ('--config', self.config_file)
+        if self.retrieve is True:
+            with stage('retriever', *config, '--symbol', self.symbol,
+                       '--file', self.ohlc_file):
+                from rt_dictionary import RTDictionary
+                self.rt_params = RTDictionary()
+
+        with stage('updater', 'predictions', *config,
+                   '--file', self.preds_file):
+            from u_dictionary import UDictionary
+            self.update_preds_params = UDictionary()
+        with stage('updater', 'forecast', *config,
+                   '--file', self.forecast_file):
+            self.update_forecast_params = UDictionary()
+
+        with stage('predictor', 'predict', *config, '--file', self.ohlc_file):
+            from cs_core import CSCore
+            from cs_dictionary import CSDictionary
+            from cse_cache import CSECache
+            from ticks import Ticks
+            self.predict_params = CSDictionary()
+            self.ticks = Ticks(self.predict_params)
+            self.cse_cache = CSECache(self.predict_params, self.ohlc_file)
+            self.core = CSCore(self.predict_params)
+            self.client = None
+            if self.server is True:
+                from cs_client import PredictionClient
+                self.client = PredictionClient(
+                    self.predict_params.server.host,
+                    self.predict_params.server.port)
+                if not self.client.available():
+                    self.log.warn('No prediction server at {}, loading '
+                                  'networks'.format(self.client.url))
+                    self.client = None
+            if self.client is None:
+                models_key = realpath(self.config_file)
+                if models_key not in predictor_models:
+                    predictor_models[models_key] = self.core.prepare_predict()
+                self.nn, self.encoder = predictor_models[models_key]
+        with stage('predictor', 'ensemble', *config, '--file', self.preds_file):
+            self.ensemble_params = CSDictionary()
+
+        with stage('indicators', '--today', *config, '--file', self.ohlc_file,
+                   '--scaler-file', self.scaler_file):
+            from ix_dictionary import IXDictionary
+            self.ix_params = IXDictionary()
+            self.indicator_class = getattr(
+                import_module(self.ix_params.indicator_name),
+                self.ix_params.indicator_class)
+            self.scaler = joblib.load(self.ix_params.scaler_name)
+
+        model = ('-f', self.forecast_file, '--model', self.rl_model)
+        with stage('trader', 'predict', *config, *model,
+                   '--portfolio', self.portfolio):
+            from agent import Agent
+            from rl_dictionary import RLDictionary
+            self.trader_params = RLDictionary()
+            self.trader = Agent(self.trader_params)
+        with stage('trader', 'simulate', *config, *model, '--no-dump',
+                   '--debug', '0'):
+            self.simulator_params = RLDictionary()
+            self.simulator = Agent(self.simulator_params)
+
+    def run(self) -> dict:
+        """
+        Run the whole sequence once.
+        :return: the recommendation, with the symbol, date, closing,
+            forecast, action and reference, or None if there's nothing to do.
+        """
+        ohlc = self.latest_ohlc()
+        if ohlc is None:
+            return None
+
+        self.update_predictions(ohlc)
+        predictions = self.predict()
+        forecast = self.ensemble(predictions)
+        indicator = self.indicators()
+        self.update_forecast(ohlc, forecast, indicator)
+
+        action = self.recommend()
+        tmp_dictionary = self.update_forecast_params.tmp_dictionary
+        close = ohlc[tmp_dictionary.close]
+        if action == 'sell':
+            reference = 'minimum at {}'.format(close)
+        elif action == 'buy':
+            reference = 'maximum at {}'.format(close)
+        else:
+            reference = ''
+        self.log.info('The recommendation is {} {}'.format(action, reference))
+
+        self.simulate()
+        return {'symbol': self.symbol,
+                'date': ohlc[tmp_dictionary.date],
+                'close': close,
+                'forecast': forecast[tmp_dictionary.ensemble],
+                'action': action,
+                'reference': reference}
+
+    def latest_ohlc(self) -> dict:
+        """
+        Retrieve the latest OHLC values and append them to the OHLC file,
+        or read them from the temporary OHLC file if not retrieving.
+        :return: the OHLCV values, or None if the pipeline must stop.
+        """
+        if self.retrieve is False:
+            ohlc = read_json(self.update_preds_params.tmp_ohlc)
+            if ohlc is None:
+                self.log.error('No-retrieve mode, but {} does not exist'.format(
+                    self.update_preds_params.tmp_ohlc))
+            return ohlc
+
+        self.log.info('Retrieving latest OHLC data')
+        with stage('retriever'):
+            from closing import closing
+            from retriever.retriever import retrieve
+            stock_data, stock_date = closing.retrieve_stock_data(
+                self.rt_params)
+            ohlc = retrieve(self.rt_params, stock_data, stock_date)
+        if ohlc is None:
+            self.log.warn('No new OHLC data. Stopping.')
+        elif float(ohlc[self.rt_params.ohlc_columns[-1]]) == 0.:
+            self.log.warn('Volume is ZERO. Aborting pipeline.')
+            return None
+        return ohlc
+
+    def update_predictions(self, ohlc: dict):
+        """ Update the predictions file with the latest closing """
+        self.log.info('Update predictions')
+        with stage('updater'):
+            from update import Update
+            Update(self.update_preds_params, 'predictions',
+                   preds=self.predictions, ohlc=ohlc)
+
+    def predict(self) -> pd.Series:
+        """
+        Predict the next closing with every network.
+        :return: the prediction of each network.
+        """
+        self.log.info('Predicting closing values')
+        with stage('predictor'):
+            self.cse_cache.update()
+            if self.client is not None:
+                predictions, _ = self.client.predict(self.cse_cache.ticks())
+            else:
+                predictions = self.core.reorder_predictions(
+                    self.core.predict_newdata(
+                        self.cse_cache.ohlc(self.ticks), self.nn,
+                        self.encoder, self.ticks, self.cse_cache.cse),
+                    self.predict_params).iloc[-1]
+
+        self.predictions = predictions.to_dict()
+        predictions.to_json(self.predict_params.json_prediction)
+        return predictions
+
+    def ensemble(self, predictions: pd.Series) -> dict:
+        """ Compute the ensemble of the predictions passed """
+        self.log.info('Computing ensemble')
+        with stage('predictor'):
+            from ensemble import Ensemble
+            ensemble = Ensemble(self.ensemble_params, predictions=predictions)
+        return ensemble.ensemble_data[['w_avg']].iloc[-1].to_dict()
+
+    def indicators(self) -> dict:
+        """ Compute the indicators for the latest OHLC values """
+        self.log.info('Computing technical indicators')
+        with stage('indicators'):
+            indicator = self.indicator_class(self.ix_params)
+            return indicator.today_values(self.scaler).to_dict()
+
+    def update_forecast(self, ohlc: dict, forecast: dict, indicator: dict):
+        """ Update the forecast file with the closing, forecast and indicators """
+        self.log.info('Updating forecast file')
+        with stage('updater'):
+            from update import Update
+            Update(self.update_forecast_params, 'forecast',
+                   ohlc=ohlc, ensemble=forecast, indicator=indicator)
+
+    def recommend(self) -> str:
+        """
+        Generate a trading recommendation, updating the portfolio.
+        :return: the action recommended, or None if none was produced.
+        """
+        self.log.info('Running trader')
+        with stage('trader'):
+            from environment import Environment
+            environment = Environment(self.trader_params)
+            if self.strategy is None:
+                self.strategy = self.trader.q_load(environment)
+            if self.trader.single_step(environment, self.strategy) == -1:
+                return None
+            return environment.memory.last('action')
+
+    def simulate(self):
+        """ Simulate the portfolio so far, to check how it goes """
+        self.log.info('Simulation for existing portfolio {}'.format(
+            self.portfolio))
+        with stage('trader'):
+            from environment import Environment
+            environment = Environment(self.simulator_params)
+            self.simulator.simulate(environment, self.strategy)
+
+
+def run_symbol(task: tuple) -> dict:
+    """
+    Run the pipeline for a symbol of a batch, in a worker process.
+    :param task: the symbol, its staging directory, configuration file,
+        whether to retrieve the latest OHLC values, and whether to use the
+        prediction server.
+    :return: the recommendation, with an 'error' if the pipeline failed.
+    """
+    symbol, staging_dir, config_file, retrieve, server = task
+    try:
+        pipeline = Pipeline(symbol, config_file, retrieve=retrieve,
+                            staging_dir=staging_dir, server=server)
+        recommendation = pipeline.run()
+        if recommendation is None:
+            return {'symbol': symbol, 'error': 'Nothing to do'}
+        return recommendation
+    except Exception as exc:
+        return {'symbol': symbol, 'error': str(exc)}
+
+
+def run_batch(batch_file: str, config_file: str, retrieve: bool,
+              server: bool = False):
+    """
+    Run the pipeline for all the symbols in a batch file, and write the
+    report with all the recommendations.
+    :param batch_file: the YAML file with the symbols, nr. of workers and
+        name of the report.
+    :param config_file: the default configuration file for the symbols.
+    :param retrieve: the default retrieve mode for the symbols.
+    :param server: whether to use the prediction server.
+    :return: the data frame with the recommendations.
+    """
+    batch = Dictionary(abspath(batch_file))
+    tasks = []
+    for symbol, settings in batch.symbols.items():
+        tasks.append((symbol,
+                      abspath(settings.staging),
+                      settings.get('config', config_file),
+                      settings.get('retrieve', retrieve),
+                      server))
+    # Symbols sharing a configuration file go in sequence, so that workers
+    # tend to run those sharing the networks they have already loaded.
+    tasks.sort(key=lambda task: task[2])
+
+    n_workers = min(batch.get('workers', os.cpu_count()), len(tasks))
+    with Pool(n_workers) as pool:
+        recommendations = pool.map(run_symbol, tasks, chunksize=1)
+
+    report = pd.DataFrame(recommendations)
+    report.to_csv(abspath(batch.get('report', 'recommendations.csv')),
+                  index=False)
+    print(report.to_string(index=False))
+    return report
+
+
+def next_run(at: str) -> datetime:
+    """ The next time, from now, at the hour and minute passed as HH:MM """
+    hour, minute = map(int, at.split(':'))
+    now = datetime.now()
+    run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-c', '--config', default='params.yaml',
+        help='Name of the configuration file (YAML) in each module directory')
+    symbols = parser.add_mutually_exclusive_group(required=True)
+    symbols.add_argument(
+        '-s', '--symbol',
+        help='The acronym of the symbol to be retrieved from the provider')
+    symbols.add_argument(
+        '-b', '--batch',
+        help='YAML file with the symbols to run, and their staging dirs')
+    parser.add_argument(
+        '-n', '--no-retrieve', action='store_true',
+        help='Do not retrieve the latest OHLCV values, and use those in the '
+             'temporary OHLC file instead')
+    parser.add_argument(
+        '--daemon', metavar='HH:MM',
+        help='Keep running, and run the pipeline every day at this time')
+    parser.add_argument(
+        '--server', action='store_true',
+        help='Get the predictions from the prediction server, instead of '
+             'loading the networks')
+    parser.add_argument(
+        '-d', '--debug', type=int, default=3,
+        help='Debug level (0..4), default 3.')
+    args = parser.parse_args(argv[1:])
+
+    if args.batch is not None:
+        run_batch(args.batch, args.config, retrieve=not args.no_retrieve,
+                  server=args.server)
+        return
+
+    pipeline = Pipeline(args.symbol, args.config,
+                        retrieve=not args.no_retrieve, log_level=args.debug,
+                        server=args.server)
+    if args.daemon is None:
+        pipeline.run()
+        return
+
+    while True:
+        run_at = next_run(args.daemon)
+        pipeline.log.info('Next run at {}'.format(run_at))
+        time.sleep((run_at - datetime.now()).total_seconds())
+        try:
+            pipeline.run()
+        except Exception as exc:
+            pipeline.log.error('Pipeline failed: {}'.format(exc))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -73,7 +73,6 @@ SCALER="../staging/${SYMBOL}/scaler.pickle"
 
 # Temporary files
 TMP_DIR="/tmp/trader"
-TMP_OHLC="${TMP_DIR}/${SYMBOL}/tail_ohlc.csv"
 LATEST_ACTION="${TMP_DIR}/${SYMBOL}/tmp_action.json"
 LATEST_OHLC="${TMP_DIR}/${SYMBOL}/tmp_ohlc.json"
 
@@ -109,7 +108,8 @@ if [ "$RETRIEVE" = true ]; then
   echo "$LOGHEADER Retrieving latest OHLC data"
   cd retriever
   python retriever.py --config "${CONFIG_FILE}" --symbol "${SYMBOL}" --file "${OHLC_FILE}"
-  volume=`awk -F":" '{print $NF}' "${TMP_OHLC}"|tr -d '"'|tr -d '}'`
+  # The volume is the last value in the JSON file written by the retriever.
+  volume=`awk -F":" '{print $NF}' "${LATEST_OHLC}"|tr -d '"'|tr -d '}'`
   if [ "$volume" = "0" ]; then
     echo "$LOGHEADER Volume is ZERO. Aborting pipeline."
     exit 1
@@ -124,15 +124,12 @@ echo "$LOGHEADER Update predictions"
 cd "${ROOT_DIR}"/updater
 python updater.py predictions --config "${CONFIG_FILE}" --file "${PREDS_FILE}"
 
-# Generate a small sample to run predictions on it (smaller = faster)
-echo "$LOGHEADER Generating tmp OHLC file"
-head -1 "${OHLC_FILE}" > "${TMP_OHLC}"
-tail -90 "${OHLC_FILE}" >> "${TMP_OHLC}"
-
 # Predict What will be the next value for stock, from each network trained.
+# The latest ticks are read, already encoded, from the CSE cache next to the
+# OHLC file, which is built on first use and appended to by the retriever.
 echo "$LOGHEADER Predicting closing values"
 cd ../predictor
-python predictor.py predict --config "${CONFIG_FILE}" --file "${TMP_OHLC}"
+python predictor.py predict --config "${CONFIG_FILE}" --file "${OHLC_FILE}"
 
 # Produce the ensemble from all predictions from all networks
 echo "$LOGHEADER Computing ensemble"
@@ -4,7 +4,7 @@ import argparse
 class Arguments(object):
     args = None
     possible_actions = ['train', 'predict_training', 'predict',
-                        'ensemble_predictions', 'ensemble']
+                        'ensemble_predictions', 'ensemble', 'serve']
     parser: argparse.ArgumentParser = None
 
     def __init__(self, *args):
@@ -17,8 +17,8 @@ class Arguments(object):
             '-c', '--config-file', nargs=1, type=str,
             help='Relative path to configuration file to be used (YAML).')
         self.parser.add_argument(
-            '-f', '--file', nargs=1, type=str, required=True,
-            help='Input OHLCV File to process')
+            '-f', '--file', nargs=1, type=str,
+            help='Input OHLCV File to process (not needed to serve)')
         self.parser.add_argument(
             '-s', '--save', action='store_true',
             help='Save predictions, default OFF')
@@ -39,6 +39,9 @@ class Arguments(object):
             help='Debug level (0..4), default 3.')
 
         self.args = self.parser.parse_args()
+        if self.args.file is None and self.args.action != 'serve':
+            self.parser.error('argument -f/--file is required to {}'.format(
+                self.args.action))
         action_name = 'arg_{}'.format(self.args.action)
         setattr(self, action_name, True)
         for action in set(self.possible_actions) - {action_name[1:]}:
@@ -1,3 +1,5 @@
+from time import perf_counter
+
 import numpy as np
 import pandas as pd
 from pandas import DataFrame
@@ -6,113 +8,165 @@ from pandas import DataFrame
 # log = Logger(3)
 
 
-def predict_close(ticks, encoder, nn, params):
+def input_key(encoder) -> tuple:
+    """
+    The window size and one-hot vocabularies of an encoder. Networks whose
+    encoders have the same key take exactly the same inputs, since the CSE
+    encoding of the ticks does not depend on the encoder.
     """
-    From a list of ticks, make a prediction of what will be the next CS.
+    return (encoder.params.window_size,) + tuple(
+        tuple(sorted(encoder.onehot[subtype].dictionary.items()))
+        for subtype in sorted(encoder.onehot))
 
-    :param ticks: a dataframe of ticks with the expected headers and size
-        corresponding to the window size of the network to be used.
+
+def window_inputs(cse, positions, encoder) -> dict:
+    """
+    Build the inputs of the networks for the windows of ticks that end right
+    before the positions passed, in the expected LSTM format, with all the
+    windows stacked.
+
+    :param cse: the CSEArray with the encoding of the ticks.
+    :param positions: the position in `cse` of the tick following each
+        window. Windows have the size of the window of the network to be
+        used, taken from the window_size attribute within the 'encoder'.
+    :param encoder: the encoder used to train the networks.
+
+    :return: the one-hot encoded windows, for the 'body' and 'move' networks.
+    """
+    w_size = encoder.params.window_size
+    windows = positions[:, np.newaxis] - w_size + np.arange(w_size)
+    if windows.min() < 0:
+        raise ValueError('Not enough ticks for a window of {}'.format(w_size))
+
+    # Only the ticks from the first window on are one-hot encoded. The first
+    # tick of a window has no previous tick to encode its movement, so it is
+    # encoded against itself, as a single tick would be.
+    first = windows.min()
+    cs_tick = cse[first:positions.max()]
+    windows = windows - first
+    body_oh = encoder.onehot['body'].encode(encoder.body(cs_tick)).values
+    move_oh = encoder.onehot['move'].encode(encoder.move(cs_tick)).values
+    no_move_oh = encoder.onehot['move'].encode(
+        encoder.move(encoder.ticks2cse(cs_tick.values[:1]))).values
+
+    inputs = {'body': body_oh[windows], 'move': move_oh[windows]}
+    inputs['move'][:, 0, :] = no_move_oh
+    return inputs
+
+
+def predict_closes(inputs: dict, prev_cse, encoder, nn, params):
+    """
+    Make a prediction of what will be the next CS after each of the windows
+    of ticks passed, with a single pass of all the windows stacked through
+    each network.
+
+    :param inputs: the windows for the 'body' and 'move' networks, as
+        returned by `window_inputs`.
+    :param prev_cse: the CSEArray with the encoding of the last tick of each
+        window.
     :param encoder: the encoder used to train the network
     :param nn: the recurrent network to make the prediction with
     :param params: the parameters file read from configuration.
 
-    :return: the close value of the CS predicted.
+    :return: the array of close values of the CS predicted after each window.
     """
-    # Check that the input group of ticks match the size of the window of
-    # the network that is going to make the predict. That parameter is in
-    # the window_size attribute within the 'encoder'.
-    if ticks.shape[0] != encoder.params.window_size:
-        info_msg = 'Tickgroup resizing: {} -> {}'
-        params.log.info(
-            info_msg.format(ticks.shape[0], encoder.params.window_size))
-        ticks = ticks.iloc[-encoder.params.window_size():, :]
-        ticks.reset_index()
-
-    # encode the tick in CSE and OH. Reshape it to the expected LSTM format.
-    cs_tick = encoder.ticks2cse(ticks)
-    cs_tick_body_oh = encoder.onehot['body'].encode(encoder.body(cs_tick))
-    cs_tick_move_oh = encoder.onehot['move'].encode(encoder.move(cs_tick))
-
-    input_body = cs_tick_body_oh.values[np.newaxis, :, :]
-    input_move = cs_tick_move_oh.values[np.newaxis, :, :]
-
     # get a prediction from the proper networks, for the body part
-    raw_prediction = nn['body'].predict(input_body)[0]
-    pred_body_oh = nn['body'].hardmax(raw_prediction)
-    pred_body_cs = encoder.onehot['body'].decode(pred_body_oh)
+    y = nn['body'].predict(inputs['body'])
+    pred_body_cs = encoder.onehot['body'].decode(nn['body'].hardmax(y))
 
     # Repeat everything with the move:
-    # get a prediction from the proper network, for the MOVE part
+    # get a prediction from the proper network, for the MOVE part, which
+    # has one group of pred_length values for each of O, H, L and C.
     pred_length = len(encoder.onehot['move'].states)
-    num_predictions = int(input_move.shape[2] / pred_length)
-    y = nn['move'].predict(input_move)[0]
-    Y_pred = [
-        nn['move'].hardmax(y[i * pred_length:(i * pred_length) + pred_length])
-        for i in range(num_predictions)
-    ]
-    pred_move_cs = [
-        encoder.onehot['move'].decode(Y_pred[i])[0] for i in
-        range(num_predictions)
-    ]
-
-    # Decode the prediction into a normal tick (I'm here!!!)
-    prediction_df = pd.DataFrame([], columns=params.cse_tags)
-    prediction_cs = np.concatenate((pred_body_cs, pred_move_cs), axis=0)
-    this_prediction = dict(zip(params.cse_tags, prediction_cs))
-    prediction_df = prediction_df.append(this_prediction, ignore_index=True)
-    params.log.info('Net {} ID {} -> {}:{}|{}|{}|{}'.format(
+    y = nn['move'].predict(inputs['move']).reshape(-1, pred_length)
+    pred_move_cs = encoder.onehot['move'].decode(
+        nn['move'].hardmax(y)).reshape(len(prev_cse), -1)
+
+    # Decode the predictions into normal ticks
+    prediction_df = pd.DataFrame(
+        np.column_stack((pred_body_cs, pred_move_cs)),
+        columns=params.cse_tags)
+    params.log.info('Net {} ID {} -> {} predictions, last {}'.format(
         nn['body'].name,
         hex(id(nn)),
-        prediction_df[params.cse_tags[0]].values[0],
-        prediction_df[params.cse_tags[1]].values[0],
-        prediction_df[params.cse_tags[2]].values[0],
-        prediction_df[params.cse_tags[3]].values[0],
-        prediction_df[params.cse_tags[4]].values[0],
-    ))
+        len(prediction_df),
+        '|'.join(prediction_df.iloc[-1].values)))
 
-    # Convert the prediction to a real tick
-    pred = encoder.cse2ticks(prediction_df, cs_tick[-1])
-    return pred['c'].values[-1]
+    # Convert the predictions to real ticks
+    pred = encoder.next_ticks(prediction_df, prev_cse)
+    return pred['c'].values
 
 
-def single_prediction(data: DataFrame, w_pos: int, nn, encoder, params):
+def multiple_predictions(data: DataFrame, positions, nn, encoder, params,
+                         cse=None):
     """
-    Make a single prediction over a list of ticks. It uses all the
+    Make a prediction for each of the positions passed. It uses all the
     networks loaded to produce all their predictions and their average in
-    a dataframe
+    a dataframe, with one row per position. The ticks are encoded only once,
+    and the inputs only once for each group of networks with the same
+    window size and encoder (see `input_key`).
     :param data: data in OHLC
-    :param w_pos: end position of window in data.
+    :param positions: end position (excluded) of each window in data.
     :param nn: the nets to be used to perform the prediction
     :param encoder: the encoders of the nets
     :param params: the parameters of the config file.
+    :param cse: the CSEArray with the encoding of data, if already done.
     """
     model_names = list(params.model_names.keys())
-    predictions = np.array([], dtype=np.float64)
+    positions = np.asarray(positions)
+    ohlc = data[['o', 'h', 'l', 'c']].values
+    if cse is None:
+        cse = encoder[model_names[0]].ticks2cse(ohlc)
+    # The predictions are decoded from the last tick of each window, with
+    # the values in data, which might be scaled with respect to `cse`.
+    prev_cse = encoder[model_names[0]].ticks2cse(ohlc[positions - 1])
+
+    groups = {}
     for name in model_names:
-        w_size = encoder[name].params.window_size
-        # Select a window of data starting from 'w_pos', but if it is -1
-        # that means that the window is the last w_size elements in data.
-        if w_pos == -1:
-            tick_group = data.tail(w_size + 1).iloc[-w_size - 1:-1]
-        else:
-            tick_group = data.iloc[w_pos - w_size:w_pos]
-        next_close = predict_close(tick_group[['o', 'h', 'l', 'c']],
-                                   encoder[name], nn[name], params)
-        predictions = np.append(predictions, [next_close])
+        groups.setdefault(input_key(encoder[name]), []).append(name)
+
+    closes, latency = {}, {}
+    for names in groups.values():
+        inputs = window_inputs(cse, positions, encoder[names[0]])
+        for name in names:
+            start = perf_counter()
+            closes[name] = predict_closes(inputs, prev_cse, encoder[name],
+                                          nn[name], params)
+            latency[name] = perf_counter() - start
+    params.log.info('{} networks in {} input groups, latency: {}'.format(
+        len(model_names), len(groups),
+        ', '.join('{} {:.1f}ms'.format(name, 1000. * latency[name])
+                  for name in model_names)))
+    df = pd.DataFrame({name: closes[name] for name in model_names})
 
     # If the number of models is greater than 1, I also add statistics about
     # their result.
     if len(model_names) > 1:
-        new_cols = ['actual', 'avg', 'avg_diff', 'median', 'med_diff', 'winner']
-    else:
-        new_cols = []
+        df['actual'] = np.nan
+        df['avg'] = df[model_names].mean(axis=1)
+        df['avg_diff'] = np.nan
+        df['median'] = df[model_names + ['avg']].median(axis=1)
+        df['med_diff'] = np.nan
+        df['winner'] = np.nan
 
-    df = pd.DataFrame([], columns=model_names + new_cols)
-    df = df.append(dict(zip(params.model_names.keys(), predictions)),
-                   ignore_index=True)
+    return df
 
-    if len(model_names) > 1:
-        df['avg'] = df.mean(axis=1)
-        df['median'] = df.median(axis=1)
 
-    return df
+def single_prediction(data: DataFrame, w_pos: int, nn, encoder, params,
+                      cse=None):
+    """
+    Make a single prediction over a list of ticks. It uses all the
+    networks loaded to produce all their predictions and their average in
+    a dataframe
+    :param data: data in OHLC
+    :param w_pos: end position of window in data.
+    :param nn: the nets to be used to perform the prediction
+    :param encoder: the encoders of the nets
+    :param params: the parameters of the config file.
+    :param cse: the CSEArray with the encoding of data, if already done.
+    """
+    # If 'w_pos' is -1 that means that the window is the last w_size
+    # elements in data, leaving out the last one.
+    if w_pos == -1:
+        w_pos = data.shape[0] - 1
+    return multiple_predictions(data, [w_pos], nn, encoder, params, cse)
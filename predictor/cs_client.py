@@ -0,0 +1,63 @@
+import json
+from os.path import abspath
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+import pandas as pd
+from pandas import DataFrame, Series
+
+
+class PredictionClient:
+    """
+    Thin client of the prediction server (see `cs_server`), to get the
+    predictions of the networks it keeps loaded.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 8501,
+                 timeout: float = 60.):
+        self.url = 'http://{}:{}'.format(host, port)
+        self.timeout = timeout
+
+    def available(self) -> bool:
+        """ Whether the server is up, and answering """
+        try:
+            self.request('/models')
+            return True
+        except (URLError, OSError):
+            return False
+
+    def models(self) -> list:
+        """ The names of the networks loaded in the server """
+        return self.request('/models')['models']
+
+    def predict(self, ohlc: DataFrame,
+                predictions_file: str = None) -> (Series, float):
+        """
+        Predict the next closing with every network in the server.
+        :param ohlc: the OHLC values, with the columns named as in the OHLC
+            files. The last row is left out as the actual value.
+        :param predictions_file: the predictions file to compute the weights
+            of the ensemble from. If None, the ensemble is not computed.
+        :return: the prediction of each network, and their ensemble.
+        """
+        reply = self.request('/predict', {
+            'ohlc': ohlc.to_dict(orient='list'),
+            'predictions_file': None if predictions_file is None else abspath(
+                predictions_file)})
+        return pd.Series(reply['predictions']), reply['ensemble']
+
+    def request(self, path: str, body: dict = None) -> dict:
+        """
+        Send a request to the server: a POST with the body in JSON, if any,
+        or a GET otherwise.
+        :return: the reply, from JSON.
+        """
+        data = None if body is None else json.dumps(body).encode('utf-8')
+        request = Request(self.url + path, data=data,
+                          headers={'Content-Type': 'application/json'})
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except HTTPError as error:
+            raise RuntimeError('Prediction server error: {}'.format(
+                json.load(error).get('error')))
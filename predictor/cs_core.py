@@ -1,9 +1,10 @@
 from os.path import splitext, basename
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
-from cs_api import single_prediction
+from cs_api import multiple_predictions, single_prediction
 from cs_encoder import CSEncoder
 from cs_nn import CS_NN
 from dataset import Dataset
@@ -16,16 +17,20 @@ class CSCore:
         self.params = params
         self.log = params.log
 
-    def train(self, data: DataFrame):
+    def train(self, data: DataFrame, scale: tuple = None):
         """
         Train networks to the data (OHLC) passed
         :param data: Data in OHLC format from the ticks module.
+        :param scale: the min and max values data was normalized with, to be
+            saved with the encoder.
         :return: the NN trained, and the encoder used
         """
         # Remove the "Date" Column
         ticks = data.copy(deep=True).drop([self.params.csv_dict['d']], axis=1)
         # Train
         encoder = CSEncoder(self.params).fit(ticks)
+        if scale is not None:
+            encoder.min_value, encoder.max_value = scale
         cse = encoder.ticks2cse(ticks)
         dataset = self.prepare_input(encoder, cse, self.params.subtypes)
         nn = self.train_nn(dataset, self.params.subtypes)
@@ -74,31 +79,38 @@ class CSCore:
 
         return nn, encoder
 
+    @staticmethod
+    def training_scale(encoder) -> tuple:
+        """
+        The min and max values the training ticks were normalized with, as
+        saved with the encoders, or None if they were not saved.
+        """
+        for name in encoder:
+            if encoder[name].min_value is not None:
+                return encoder[name].min_value, encoder[name].max_value
+        return None
+
     def predict_training(self, data, nn, encoder, ticks) -> DataFrame:
         self.log.info('Performing prediction over TRAINING set')
-        predictions = pd.DataFrame([])
         date_column = self.params.csv_dict['d']
 
         num_ticks = data.shape[0]
         max_wsize = max(
             [encoder[name].params.window_size for name in
              self.params.model_names])
-        train_range = range(0 + max_wsize, num_ticks - 1)
+        train_range = np.arange(0 + max_wsize, num_ticks - 1)
 
         self.log.info('Predicting over {} training ticks'.format(num_ticks))
-        self.log.info('Looping {} groups of {} ticks'.format(
+        self.log.info('Batching {} groups of {} ticks'.format(
             len(train_range), max_wsize))
 
-        for from_idx in train_range:
-            prediction = single_prediction(data, from_idx, nn, encoder,
+        predictions = multiple_predictions(data, train_range, nn, encoder,
                                            self.params)
-            prediction = self.add_supervised_info(
-                prediction,
-                data.iloc[from_idx]['c'], self.params)
-            prediction.insert(loc=0,
-                              column=date_column,
-                              value=data.iloc[from_idx]['Date'])
-            predictions = predictions.append(prediction)
+        predictions = self.add_supervised_info(
+            predictions, data['c'].values[train_range], self.params)
+        predictions.insert(loc=0,
+                           column=date_column,
+                           value=data[date_column].values[train_range])
         predictions = pd.concat((
             predictions[date_column],
             ticks.scale_back(
@@ -107,13 +119,16 @@ class CSCore:
 
         return predictions
 
-    def predict_newdata(self, data, nn, encoder, ticks) -> DataFrame:
+    def predict_newdata(self, data, nn, encoder, ticks,
+                        cse=None) -> DataFrame:
         self.log.info('Performing prediction over NEW UNKNOWN data')
         predictions = pd.DataFrame([])
 
         # Take only the last window_size+1 elements, leaving
-        # the last as the actual value
-        prediction = single_prediction(data, -1, nn, encoder, self.params)
+        # the last as the actual value. The encoding of data can be passed
+        # in `cse`, if already available, as in the CSE cache.
+        prediction = single_prediction(data, -1, nn, encoder, self.params,
+                                       cse)
         predictions = ticks.scale_back(predictions.append(prediction))
 
         return predictions
@@ -128,7 +143,8 @@ class CSCore:
         :param prediction: the prediction made by all networks in a form of
         DataFrame with the columns being the name of the networks
         :param real_value: the actual value that followed the sequence presented
-        to the set of networks. This is the value to be predicted.
+        to the set of networks. This is the value to be predicted. An array
+        with one value per row, when there are several predictions.
         :param params: The parameters of the whole enchilada
 
         :return: The dataframe of the predictions enriched with the actual
@@ -146,15 +162,11 @@ class CSCore:
             prediction['med_diff'] = diff_with('median')
             if params.ensemble is True:
                 prediction['ens_diff'] = diff_with('ensemble')
-            max_diff = 10000000.0
-            winner = ''
-            for name in params.model_names.keys():
-                diff = abs(
-                    prediction[name].iloc[-1] - prediction['actual'].iloc[-1])
-                if diff < max_diff:
-                    max_diff = diff
-                    winner = name
-            prediction.loc[:, 'winner'] = winner
+            # The first network with the smallest difference, in each row.
+            diffs = np.abs(prediction[model_names].values.astype(float) -
+                           prediction[['actual']].values.astype(float))
+            prediction.loc[:, 'winner'] = np.array(model_names)[
+                np.argmin(diffs, axis=1)]
         return prediction
 
     @staticmethod
@@ -22,7 +22,9 @@ class CSDictionary(Dictionary):
 
         setattr(self, 'do_plot', arguments.args.plot)
         setattr(self, 'save_predictions', arguments.args.save)
-        setattr(self, 'input_file', arguments.args.file[0])
+        setattr(self, 'input_file',
+                arguments.args.file[0] if arguments.args.file is not None
+                else '')
         if arguments.args.window is not None:
             setattr(self, 'window_size', arguments.args.window[0])
         else:
@@ -1,4 +1,5 @@
 import pickle
+from copy import copy
 from os.path import basename, join, splitext, dirname, realpath
 from pathlib import Path
 
@@ -7,7 +8,7 @@ import pandas as pd
 
 from oh_encoder import OHEncoder
 from utils.file_io import file_exists, valid_output_name
-from utils.strings import which_string, previous
+from utils.strings import which_string
 
 
 class CSEncoder:
@@ -22,7 +23,12 @@ class CSEncoder:
     cse_zero_close = 0.0
     fitted = False
 
+    # Min and max values used to normalize the ticks the encoder was fit to.
+    min_value = None
+    max_value = None
+
     onehot = {}
+    decoding = None
 
     min_relative_size = 0.02
     shadow_symmetry_diff_threshold = 0.1
@@ -337,87 +343,77 @@ class CSEncoder:
             setattr(self, 'encoded_delta_{}'.format(attr), '{}{}'.format(
                 sign_letter, encoding))
 
-    def adjust_body(self, letter, tick):
-        """Given an encoding letter used for the body of the CS, return the
-        expected positions of the upper and lower parts of the body, according
-        to the encoding rules.
+    @classmethod
+    def decoding_tables(cls) -> dict:
+        """
+        Lookup arrays to decode letters, indexed by the position of the
+        letter in the alphabet: the movement offset (upper limit) each
+        movement letter stands for, and the size and shift of the body that
+        each body letter stands for. Letters not in use are NaN.
+        """
+        if cls.decoding is None:
+            offset = np.full(26, np.nan)
+            for pos, letter in enumerate(cls.def_prcntg_mvmt_encodings):
+                offset[ord(letter) - ord('A')] = cls.def_mvmt_upper_limits[
+                    min(pos, len(cls.def_mvmt_upper_limits) - 1)]
+            body_size = np.full(26, np.nan)
+            body_shift = np.full(26, np.nan)
+            for letter in cls.def_prcntg_body_encodings:
+                (block, pos) = which_string(cls.def_enc_body_groups, letter)
+                body_size[ord(letter) - ord('A')] = cls.def_enc_body_sizes[
+                    block]
+                body_shift[ord(letter) - ord('A')] = cls.cs_shift[pos]
+            cls.decoding = {'offset': offset, 'body_size': body_size,
+                            'body_shift': body_shift}
+        return cls.decoding
+
+    @staticmethod
+    def code_points(codes) -> (np.ndarray, np.ndarray):
+        """
+        Split an array of two-letter codes (sign and letter, like 'pA')
+        into a boolean array telling if the sign is 'n' and the array of
+        positions of the letters in the alphabet.
+        """
+        chars = np.asarray(codes, dtype='U2').view(np.uint32).reshape(-1, 2)
+        return chars[:, 0] == ord('n'), chars[:, 1].astype(np.int64) - ord('A')
+
+    def decode_movement(self, codes) -> np.ndarray:
+        """
+        Decode an array of movement codes into the offsets they represent,
+        as a proportion of the range of the previous tick.
+        """
+        negative, letters = self.code_points(codes)
+        valid = (letters >= 0) & (letters < 26)
+        offset = self.decoding_tables()['offset'][np.where(valid, letters, 0)]
+        if not valid.all() or np.isnan(offset).any():
+            raise ValueError('Unknown movement code in: {}'.format(
+                list(np.asarray(codes)[~valid | np.isnan(offset)])))
+        return np.where(negative, -offset, offset)
+
+    def adjust_body(self, ticks, letters):
+        """Given the letters used for the body of the CSs, place the upper
+        and lower parts of the body of each tick, according to the encoding
+        rules.
         Parameters:
-          - letter: the letter of the body encoding that determines the size
-                    of the CS as a percentage of the total height of the candle
-          - tick: the tick that needs to be adjusted with the body encoding
-                  information.
+          - ticks: the (n x 4) array of OHLC ticks to be adjusted with the
+                   body encoding information. It is modified in place.
+          - letters: the positions in the alphabet of the letters of the body
+                   encodings, that determine the size of the CS as a
+                   percentage of the total height of the candle.
         """
-        # the letter is the second character in the string.
-        self.log.debug(
-            '>> Adjusting tick: {:.02f}|{:.02f}|{:.02f}|{:.02f}'.format(
-                tick[0], tick[1], tick[2], tick[3]))
-        (block, pos) = which_string(self.def_enc_body_groups, letter)
-        body_size = self.def_enc_body_sizes[block]
-        self.log.debug('   letter ({}) => body size: {:.2f}'.format(
-            letter, body_size))
+        tables = self.decoding_tables()
+        body_size = tables['body_size'][letters]
         # High - Low is the height range the adjustment refers to.
-        tick_range = tick[1] - tick[2]
+        tick_range = ticks[:, 1] - ticks[:, 2]
         M = 0.5 + (body_size / 2.0)
         m = 0.5 - (body_size / 2.0)
-        self.log.debug('   tick range: {:.2f}, M: {:.2f}, m: {:.2f}'.format(
-            tick_range, M, m))
-        shift = ((1.0 - M) / 2.0) * self.cs_shift[pos]
-        self.log.debug('   shift = {:.2f}'.format(shift))
-        if tick[0] < tick[3]:
-            tick[0] = tick[2] + (m + shift) * tick_range
-            tick[3] = tick[2] + (M + shift) * tick_range
-        else:
-            tick[3] = tick[2] + (m + shift) * tick_range
-            tick[0] = tick[2] + (M + shift) * tick_range
-        self.log.debug('<< New tick: {:.02f}|{:.02f}|{:.02f}|{:.02f}'.format(
-            tick[0], tick[1], tick[2], tick[3]))
-        return tick
-
-    def decode_movement_code(self, code):
-        sign = code[0]
-        letter = code[1]
-        pos = self.def_prcntg_mvmt_encodings.index(letter)
-        self.log.debug('Percentage position <{}={}>'.format(letter, pos))
-        value = self.def_mvmt_upper_limits[pos] if pos < len(
-            self.def_mvmt_upper_limits) else self.def_mvmt_upper_limits[len(
-            self.def_mvmt_upper_limits)]
-        self.log.debug('New value = {:.2f}'.format(value))
-        if sign == 'n':
-            value *= -1.0
-        self.log.debug('Decoding <{}> with value: {:.2f}'.format(code, value))
-        return value
-
-    def decode_cse(self, this_cse, prev_cse, col_names):
-        """
-        From a CSE numpy array and its previous CSE numpy array in the
-        time series, returns the reconstructed tick (OHLC).
-        """
-        mm = prev_cse.hl_interval_width
-        # Set the columns names that contain the values in my date
-        amount_shift = [(self.decode_movement_code(this_cse[column]) * mm)
-                        for column in col_names]
-        self.log.debug(
-            'Amount of movement: {:.04f}|{:.04f}|{:.04f}|{:.04f}'.format(
-                amount_shift[0], amount_shift[1], amount_shift[2],
-                amount_shift[3]))
-        reconstructed_tick = [
-            prev_cse.min + amount_shift[0],
-            prev_cse.high + amount_shift[0],
-            prev_cse.low + amount_shift[0],
-            prev_cse.max + amount_shift[0]
-        ]
-        # If this CSE is negative, swap the open and close values
-        if this_cse['b'][0] == 'n':
-            self.log.debug('This CS seems to be negative')
-            open = reconstructed_tick[3]
-            close = reconstructed_tick[0]
-            reconstructed_tick[0] = open
-            reconstructed_tick[3] = close
-        self.log.debug(
-            '>> Reconstructed tick: {:.02f}|{:.02f}|{:.02f}|{:.02f}'.format(
-                reconstructed_tick[0], reconstructed_tick[1],
-                reconstructed_tick[2], reconstructed_tick[3]))
-        return reconstructed_tick
+        shift = ((1.0 - M) / 2.0) * tables['body_shift'][letters]
+        bottom = ticks[:, 2] + (m + shift) * tick_range
+        top = ticks[:, 2] + (M + shift) * tick_range
+        rising = ticks[:, 0] < ticks[:, 3]
+        ticks[:, 0] = np.where(rising, bottom, top)
+        ticks[:, 3] = np.where(rising, top, bottom)
+        return ticks
 
     # TODO: Clarify when 'd' is present in
     def cse2ticks(self, cse_codes, first_cse, col_names=None):
@@ -439,30 +435,63 @@ class CSEncoder:
             # Remove date column if present.
             if 'd' in col_names:
                 col_names.remove('d')
-        cse_decoded = [first_cse]
-        self.log.debug('Zero CS created: {:.2f}|{:.2f}|{:.2f}|{:.2f}'.format(
-            self.cse_zero_open, self.cse_zero_high, self.cse_zero_low,
-            self.cse_zero_close))
-        rec_ticks = [[
-            first_cse.open, first_cse.high, first_cse.low, first_cse.close
-        ]]
-        for i in range(0, len(cse_codes)):
-            this_cse = cse_codes.loc[cse_codes.index[i]]
-            self.log.debug('Decoding: {}|{}|{}|{}|{}'.format(
-                this_cse['b'], this_cse['o'], this_cse['h'], this_cse['l'],
-                this_cse['c']))
-            this_tick = self.decode_cse(this_cse, cse_decoded[-1], col_names)
-            cse_decoded.append(self.build_new(self.params, this_tick))
-            this_tick = self.adjust_body(this_cse['b'][1], this_tick)
-            self.log.debug(
-                'Adjusted CS body: {:.2f}|{:.2f}|{:.2f}|{:.2f}'.format(
-                    this_tick[0], this_tick[1], this_tick[2], this_tick[3]))
-            rec_ticks.append(this_tick)
+        self.log.debug(
+            'Decoding {} CSEs from: {:.2f}|{:.2f}|{:.2f}|{:.2f}'.format(
+                len(cse_codes), first_cse.open, first_cse.high,
+                first_cse.low, first_cse.close))
+
+        # Every tick is the previous one, moved by the amount encoded in
+        # the first column, in units of the range (high - low) of the
+        # previous tick. That is the only sequential part of decoding.
+        offsets = self.decode_movement(cse_codes[col_names[0]].values)
+        rec_ticks = np.empty((len(cse_codes) + 1, 4))
+        rec_ticks[0] = [first_cse.open, first_cse.high, first_cse.low,
+                        first_cse.close]
+        body_min, high, low, body_max = first_cse.min, first_cse.high, \
+            first_cse.low, first_cse.max
+        for i, offset in enumerate(offsets.tolist(), 1):
+            shift = offset * abs(high - low)
+            body_min, high, low, body_max = body_min + shift, high + shift, \
+                low + shift, body_max + shift
+            rec_ticks[i] = body_min, high, low, body_max
+
+        self.place_bodies(rec_ticks[1:], cse_codes['b'].values)
 
         result = pd.DataFrame(rec_ticks)
         result.columns = col_names
         return result
 
+    def next_ticks(self, cse_codes, prev_cse: 'CSEArray',
+                   col_names=None):
+        """Decode each of the CSE codes passed into the tick that follows
+        the one at the same position in `prev_cse`. This is what `cse2ticks`
+        does with a single CSE, for many unrelated ticks at once.
+          :param cse_codes: DataFrame with columns 'b', 'o', 'h', 'l', 'c'
+          :param prev_cse: the encodings of the reference ticks
+          :param col_names: the names of column headers to use with ticks
+          :return: the ticks as a dataframe.
+        """
+        assert self.fitted, "The encoder has not been fit with data yet!"
+        if col_names is None:
+            col_names = [name for name in self.params.csv_dict.keys()
+                         if name != 'd']
+        shift = self.decode_movement(cse_codes[col_names[0]].values) * \
+            prev_cse.hl_interval_width
+        ticks = np.column_stack((
+            prev_cse.min + shift, prev_cse.high + shift,
+            prev_cse.low + shift, prev_cse.max + shift))
+        self.place_bodies(ticks, cse_codes['b'].values)
+        return pd.DataFrame(ticks, columns=col_names)
+
+    def place_bodies(self, ticks, body_codes):
+        """If a CSE is negative, swap the open and close values of its tick,
+        and then place the body of each tick as encoded. The (n x 4) array
+        of ticks is modified in place.
+        """
+        negative, letters = self.code_points(body_codes)
+        ticks[negative] = ticks[negative][:, [3, 1, 2, 0]]
+        return self.adjust_body(ticks, letters)
+
     def encode_tick(self, tick, prev_cse):
         cse = CSEncoder(self.params, np.array(tick))
         self.log.debug(
@@ -475,16 +504,14 @@ class CSEncoder:
             cse.encode_movement(prev_cse)
         return cse
 
-    def ticks2cse(self, ticks):
+    def ticks2cse(self, ticks) -> 'CSEArray':
         """
-        Encodes a dataframe of Ticks, returning an array of CSE objects.
+        Encodes a dataframe of Ticks, returning an array of CSE objects,
+        computed all at once (see `CSEArray`).
         """
         self.log.debug('Converting ticks dim{} to CSE.'.format(ticks.shape))
-        cse = []
-        for index in range(0, ticks.shape[0]):
-            cse.append(
-                self.encode_tick(ticks.iloc[index], previous(cse, index)))
-        return cse
+        return CSEArray(self.params,
+                        np.asarray(ticks, dtype=np.float64)[:, :4])
 
     def read_cse(self, filename=None, col_names=None):
         if filename is None:
@@ -539,9 +566,9 @@ class CSEncoder:
 
     def save_cse(self, cse, filename):
         """
-        Saves a list of CSE objects to the filename specifed.
+        Saves an array of CSE to the filename specifed.
         Arguments:
-            - cse(list(CSEEncoder)): list of CSE objects
+            - cse(CSEArray): the CSE, as returned by `ticks2cse`
             - filename: the path to the file to be written as CSV
         """
         my_file = Path(filename)
@@ -549,19 +576,13 @@ class CSEncoder:
             self.log.warn('No writing to file as file alrady exists')
             return
 
-        body = [cse[i].encoded_body for i in range(len(cse))]
-        delta_open = [cse[i].encoded_delta_min for i in range(len(cse))]
-        delta_high = [cse[i].encoded_delta_high for i in range(len(cse))]
-        delta_low = [cse[i].encoded_delta_low for i in range(len(cse))]
-        delta_close = [cse[i].encoded_delta_max for i in range(len(cse))]
-
         df = pd.DataFrame(
             data={
-                'body': body,
-                'open': delta_open,
-                'high': delta_high,
-                'low': delta_low,
-                'close': delta_close
+                'body': cse.encoded_body,
+                'open': cse.encoded_delta_min,
+                'high': cse.encoded_delta_high,
+                'low': cse.encoded_delta_low,
+                'close': cse.encoded_delta_max
             })
         df.to_csv(filename, sep=',', index=False)
 
@@ -569,19 +590,15 @@ class CSEncoder:
         """
         Encodes a dataframe of Ticks, returning a dataframe of CSE values.
         """
-        cse = []
-        df = pd.DataFrame(index=range(ticks.shape[0]),
-                          columns=self.params.cse_tags)
-        for index in range(0, ticks.shape[0]):
-            cse.append(
-                self.encode_tick(ticks.iloc[index], previous(cse, index)))
-            df.loc[index] = pd.Series({
-                self.params.cse_tags[0]: cse[index].encoded_body,
-                self.params.cse_tags[1]: cse[index].encoded_delta_open,
-                self.params.cse_tags[2]: cse[index].encoded_delta_high,
-                self.params.cse_tags[3]: cse[index].encoded_delta_low,
-                self.params.cse_tags[4]: cse[index].encoded_delta_close})
-        return df
+        cse = self.ticks2cse(ticks)
+        return pd.DataFrame(
+            data={
+                self.params.cse_tags[0]: cse.encoded_body,
+                self.params.cse_tags[1]: cse.encoded_delta_open,
+                self.params.cse_tags[2]: cse.encoded_delta_high,
+                self.params.cse_tags[3]: cse.encoded_delta_low,
+                self.params.cse_tags[4]: cse.encoded_delta_close},
+            columns=self.params.cse_tags).astype(object)
 
     def info(self):
         v = vars(self)
@@ -598,14 +615,191 @@ class CSEncoder:
     @classmethod
     def body(self, cse):
         """Returns the body element of an array of encoded candlesticks"""
-        bodies = np.array([cse[i].encoded_body for i in range(len(cse))])
-        return pd.DataFrame(bodies, columns=['body'])
+        return pd.DataFrame(cse.encoded_body, columns=['body'])
 
     @classmethod
     def move(self, cse):
         """Returns the body element of an array of encoded candlesticks"""
-        ohlc = np.array([[
-            cse[i].encoded_delta_open, cse[i].encoded_delta_high,
-            cse[i].encoded_delta_low, cse[i].encoded_delta_close
-        ] for i in range(len(cse))])
+        ohlc = np.column_stack((
+            cse.encoded_delta_open, cse.encoded_delta_high,
+            cse.encoded_delta_low, cse.encoded_delta_close))
         return pd.DataFrame(ohlc, columns=self.movement_columns)
+
+
+class CSEArray:
+    """
+    The encodings of a sequence of ticks, computed all at once over NumPy
+    arrays, following the same rules that `CSEncoder` applies to a single
+    tick in `calc_parameters`, `encode_body` and `encode_movement`. Each
+    attribute of `CSEncoder` (open, hl_interval_width, encoded_body,
+    encoded_delta_close, ...) is here an array with its value for every
+    tick, and the `CSEncoder` object of a tick is only built when indexed.
+    """
+
+    def __init__(self, params, values: np.ndarray):
+        """
+        :param params: the predictor parameters
+        :param values: the array of ticks, with O, H, L, C columns
+        """
+        self.params = params
+        self.values = values
+        self.open = values[:, 0]
+        self.high = values[:, 1]
+        self.low = values[:, 2]
+        self.close = values[:, 3]
+        self.calc_parameters()
+        self.encode_body()
+        self.encode_movement()
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __getitem__(self, index):
+        """
+        The CSEncoder object of the tick at the position passed, or a
+        CSEArray with the ticks in the slice passed.
+        """
+        if isinstance(index, slice):
+            return self.with_arrays(lambda name, array: array[index])
+        cse = CSEncoder(self.params, self.values[index])
+        cse.encoded_body = str(self.encoded_body[index])
+        for attr in CSEncoder.diff_tags:
+            setattr(cse, 'delta_{}'.format(attr),
+                    getattr(self, 'delta_{}'.format(attr))[index])
+            setattr(cse, 'encoded_delta_{}'.format(attr),
+                    str(getattr(self, 'encoded_delta_{}'.format(attr))[index]))
+        return cse
+
+    @staticmethod
+    def movement_arrays() -> list:
+        """
+        The names of the arrays with the movement from the previous tick,
+        which can not be computed again from the values of the ticks alone,
+        for the first one.
+        """
+        return ['{}delta_{}'.format(prefix, attr)
+                for attr in CSEncoder.diff_tags for prefix in ['', 'encoded_']]
+
+    def with_arrays(self, function) -> 'CSEArray':
+        """
+        A copy of this object, with each array attribute replaced by the
+        result of calling `function` with its name and value.
+        """
+        cse = copy(self)
+        for name, array in vars(self).items():
+            if isinstance(array, np.ndarray):
+                setattr(cse, name, function(name, array))
+        return cse
+
+    def append(self, values: np.ndarray) -> 'CSEArray':
+        """
+        A new CSEArray with the ticks passed added at the end. Only those
+        ticks are encoded, and the movement of the first one is encoded
+        with respect to the last tick in this array.
+        :param values: the array of ticks, with O, H, L, C columns
+        """
+        values = np.atleast_2d(values)
+        new = CSEArray(self.params,
+                       np.vstack((self.values[-1:], values)))[-len(values):]
+        return self.with_arrays(
+            lambda name, array: np.concatenate((array, getattr(new, name))))
+
+    @staticmethod
+    def div(a, b):
+        return a / np.where(b == 0, 0.000001, b)
+
+    def calc_parameters(self):
+        # positive or negative movement
+        self.positive = self.close > self.open
+        self.negative = ~self.positive
+        self.max = np.where(self.positive, self.close, self.open)
+        self.min = np.where(self.positive, self.open, self.close)
+
+        # Length of the intervals, mid point of the body, percentiles of
+        # min and max values, and shadows.
+        self.hl_interval_width = np.abs(self.high - self.low)
+        self.oc_interval_width = self.max - self.min
+        self.mid_body_point = self.min + (self.oc_interval_width / 2.0)
+        self.mid_body_percentile = self.div(self.mid_body_point - self.low,
+                                            self.hl_interval_width)
+        self.min_percentile = self.div(self.min - self.low,
+                                       self.hl_interval_width)
+        self.max_percentile = self.div(self.max - self.low,
+                                       self.hl_interval_width)
+        self.upper_shadow_len = self.high - self.max
+        self.upper_shadow_percentile = self.div(self.upper_shadow_len,
+                                                self.hl_interval_width)
+        self.lower_shadow_len = self.min - self.low
+        self.lower_shadow_percentile = self.div(self.lower_shadow_len,
+                                                self.hl_interval_width)
+        self.body_relative_size = self.div(self.oc_interval_width,
+                                           self.hl_interval_width)
+
+        # Shadows larger than 2% of the interval range len, and symmetric.
+        self.has_upper_shadow = \
+            self.upper_shadow_percentile > CSEncoder.min_relative_size
+        self.has_lower_shadow = \
+            self.lower_shadow_percentile > CSEncoder.min_relative_size
+        self.has_both_shadows = self.has_upper_shadow & self.has_lower_shadow
+        self.shadows_relative_diff = np.abs(self.upper_shadow_percentile -
+                                            self.lower_shadow_percentile)
+        self.shadows_symmetric = self.has_both_shadows & (
+                self.shadows_relative_diff <
+                CSEncoder.shadow_symmetry_diff_threshold)
+
+        # Is body centered, or in the upper or lower half? If none of them,
+        # the body goes to the half opposite to the longest shadow.
+        upper_half = self.min_percentile > 0.5
+        lower_half = self.max_percentile < 0.5
+        self.body_in_center = self.shadows_symmetric & (
+                self.body_relative_size > CSEncoder.min_relative_size)
+        undecided = ~(self.body_in_center | lower_half | upper_half)
+        longer_lower = \
+            self.lower_shadow_percentile > self.upper_shadow_percentile
+        self.body_in_upper_half = upper_half | (undecided & longer_lower)
+        self.body_in_lower_half = lower_half | (undecided & ~longer_lower)
+
+    def encode_body(self):
+        # The group of letters, from the relative size of the body...
+        size = self.body_relative_size
+        group = np.select(
+            [size <= CSEncoder.min_relative_size,
+             size <= 0.1 + 0.05,
+             size <= 0.25 + 0.1,
+             size <= 0.5 + 0.1,
+             size <= 0.75 + 0.1],
+            [0, 1, 2, 3, 4], default=5)
+        # ...and the letter within the group, from the shadows and position
+        # of the body (see `encode_with`). The last group is only 'Z'.
+        position = np.select(
+            [self.body_in_center,
+             self.has_both_shadows & self.body_in_upper_half,
+             self.has_both_shadows & self.body_in_lower_half,
+             self.has_lower_shadow],
+            [0, 1, 2, 3], default=4)
+        letters = np.array([list((letters * 5)[:5]) for letters in
+                            CSEncoder.def_enc_body_groups])
+        self.encoded_body = np.char.add(np.where(self.positive, 'p', 'n'),
+                                        letters[group, position])
+
+    def encode_movement(self):
+        """
+        Encode the percentage of change of each value with respect to the
+        range of the previous tick. The first tick is compared with itself.
+        """
+        encodings = np.array(CSEncoder.def_prcntg_mvmt_encodings)
+        upper_limits = [
+            limit + threshold for limit, threshold in
+            zip(CSEncoder.def_mvmt_upper_limits,
+                CSEncoder.def_mvmt_thresholds)][:len(encodings) - 1]
+        prev_width = np.concatenate(
+            (self.hl_interval_width[:1], self.hl_interval_width[:-1]))
+        for attr in CSEncoder.diff_tags:
+            values = getattr(self, attr)
+            prev_values = np.concatenate((values[:1], values[:-1]))
+            delta = self.div(values - prev_values, prev_width)
+            encoding = encodings[np.searchsorted(upper_limits, delta)]
+            sign_letter = np.where(delta >= 0.0, 'p', 'n')
+            setattr(self, 'delta_{}'.format(attr), delta)
+            setattr(self, 'encoded_delta_{}'.format(attr),
+                    np.char.add(sign_letter, encoding))
@@ -116,17 +116,20 @@ class CS_NN(object):
 
         Argument:
           - A numpy vector of predictions of shape (1, p) with values in
-            the range (-1, 1)
+            the range (-1, 1), or an array of them, of shape (n, p).
         Returns:
           - A numpy vector of predictions of shape (1, p) with all elements
             in the vector equal to 0, except the max one, which is -1 or +1
         """
         self.log.debug('Getting hardmax of: {}'.format(y))
-        min = np.argmin(y)
-        max = np.argmax(y)
-        pos = max if abs(y[max]) > abs(y[min]) else min
+        y = np.asarray(y)
+        min = np.argmin(y, axis=-1)[..., np.newaxis]
+        max = np.argmax(y, axis=-1)[..., np.newaxis]
+        pos = np.where(np.abs(np.take_along_axis(y, max, axis=-1)) >
+                       np.abs(np.take_along_axis(y, min, axis=-1)), max, min)
         y_max = np.zeros(y.shape)
-        y_max[pos] = 1.0 if pos == max else -1.0
+        np.put_along_axis(y_max, pos, np.where(pos == max, 1.0, -1.0),
+                          axis=-1)
         self.log.debug('Hardmax position = {}'.format(y_max))
         return y_max
 
@@ -0,0 +1,116 @@
+"""
+Long-running prediction service. It loads all the networks and encoders in
+the parameters file once, and then serves predictions over HTTP, on
+localhost, for the windows of OHLC values posted to it:
+
+    POST /predict
+    {"ohlc": {"Date": [...], "Open": [...], "High": [...], ...},
+     "predictions_file": "/path/to/staging/SYMBOL/predictions.csv"}
+
+returns the prediction of each network for the tick following the window
+and, if a predictions file is passed, their ensemble, weighted with the
+networks that won in that file:
+
+    {"predictions": {"8yw20": 9.81, "8yw10": 9.77, ...}, "ensemble": 9.79}
+
+The OHLC columns are named as in the OHLC files (see `csv_dict`), and the
+latest row is left out as the actual value, as in `predictor.py predict`.
+`GET /models` returns the names of the networks loaded. Start it with
+
+    python predictor.py serve [-c CONFIG_FILE]
+
+and use `cs_client.PredictionClient` to call it.
+"""
+import json
+from copy import copy
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pandas as pd
+
+from cs_core import CSCore
+from ensemble import Ensemble
+from ticks import Ticks
+
+
+class PredictionServer:
+
+    def __init__(self, params):
+        self.params = params
+        self.log = params.log
+        self.core = CSCore(params)
+        self.nn, self.encoder = self.core.prepare_predict()
+        self.log.info('Loaded networks: {}'.format(list(self.nn.keys())))
+
+    def predict(self, request: dict) -> dict:
+        """
+        Predict the next closing with every network, and their ensemble.
+        :param request: the OHLC values and, optionally, the predictions
+            file to compute the ensemble weights from.
+        :return: the predictions, and the ensemble (None if no predictions
+            file was passed).
+        """
+        ticks = Ticks(self.params)
+        data = ticks.prepare_ohlc(pd.DataFrame(request['ohlc']))
+        predictions = self.core.reorder_predictions(
+            self.core.predict_newdata(data, self.nn, self.encoder, ticks),
+            self.params).iloc[-1]
+
+        ensemble = None
+        if request.get('predictions_file') is not None:
+            ensemble_params = copy(self.params)
+            ensemble_params.input_file = request['predictions_file']
+            ensemble_params.ensemble = True
+            ensemble = float(Ensemble(
+                ensemble_params,
+                predictions=predictions).ensemble_data['w_avg'].iloc[-1])
+
+        return {'predictions': {name: float(value) for name, value in
+                                predictions.items()},
+                'ensemble': ensemble}
+
+    def serve(self):
+        server = HTTPServer((self.params.server.host, self.params.server.port),
+                            PredictionHandler)
+        server.predictor = self
+        self.log.info('Serving predictions at http://{}:{}'.format(
+            self.params.server.host, self.params.server.port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.log.info('Stopping prediction server')
+        finally:
+            server.server_close()
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """ Requests to the prediction server, in JSON """
+
+    def do_GET(self):
+        if self.path != '/models':
+            self.reply(404, {'error': 'Unknown path {}'.format(self.path)})
+            return
+        self.reply(200, {'models': list(self.server.predictor.nn.keys())})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self.reply(404, {'error': 'Unknown path {}'.format(self.path)})
+            return
+        try:
+            length = int(self.headers['Content-Length'])
+            request = json.loads(self.rfile.read(length))
+            self.reply(200, self.server.predictor.predict(request))
+        except Exception as exc:
+            self.server.predictor.log.error(
+                'Prediction failed: {}'.format(exc))
+            self.reply(500, {'error': str(exc)})
+
+    def reply(self, status: int, body: dict):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        self.server.predictor.log.debug(format % args)
@@ -0,0 +1,172 @@
+import pickle
+from os.path import exists, splitext
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from cs_encoder import CSEArray
+from last import last
+
+
+class CSECache:
+    """
+    Per-symbol cache with the latest ticks of an OHLC file, already encoded
+    as candlesticks, and the min and max values used to normalize them. It
+    is saved next to the OHLC file (`ohlcv.csv` -> `ohlcv.cse.pickle`), and
+    the retriever appends to it every tick it adds to the file, so that a
+    prediction only has to read the window of ticks from it.
+
+    Ticks are encoded with their actual values, since the encodings are
+    relative to the range of each tick, and do not change when scaled.
+    Only the data is saved, and the ticks are encoded again when loaded,
+    with the parameters of the module loading them, keeping the movement
+    saved for the first tick (see `CSEArray.movement_arrays`).
+    """
+    # Nr. of latest ticks kept, and used to normalize them.
+    num_ticks = 90
+
+    def __init__(self, params, ohlc_file: str):
+        """
+        :param params: the parameters of the module using the cache. Only
+            the log is used, except when building it (see `build`).
+        :param ohlc_file: the OHLC file the cache is for.
+        """
+        self.params = params
+        self.log = params.log
+        self.ohlc_file = ohlc_file
+        self.filename = self.cache_name(ohlc_file)
+
+        self.columns = None
+        self.dates = None
+        self.cse: CSEArray = None
+        self.min_value = 0.
+        self.max_value = 0.
+
+    @staticmethod
+    def cache_name(ohlc_file: str) -> str:
+        return '{}.cse.pickle'.format(splitext(ohlc_file)[0])
+
+    @property
+    def last_date(self) -> str:
+        return None if self.dates is None else self.dates[-1]
+
+    def build(self, df: DataFrame) -> 'CSECache':
+        """
+        Encode the latest ticks of the OHLC data frame passed, as read from
+        the OHLC file.
+        :param df: the OHLC data, with the columns named as in the file,
+            which are taken from the `csv_dict` in the predictor parameters.
+        """
+        csv_dict = self.params.csv_dict
+        self.columns = [csv_dict[tag] for tag in ['d', 'o', 'h', 'l', 'c']]
+        df = df.tail(self.num_ticks)
+        self.dates = df[self.columns[0]].values
+        self.cse = CSEArray(self.params,
+                            df[self.columns[1:]].values.astype(np.float64))
+        self.normalization()
+        self.log.info('Encoded {} ticks from {} in cache'.format(
+            len(self.cse), self.ohlc_file))
+        return self
+
+    def append(self, row: dict) -> bool:
+        """
+        Encode the tick passed, and add it to the cache, as the latest one.
+        :param row: the OHLC values, with the names of the columns in the
+            OHLC file.
+        :return: False if the tick was not newer than the latest one.
+        """
+        if str(row[self.columns[0]]) <= str(self.last_date):
+            self.log.warn('Tick for <{}> already in cache'.format(
+                row[self.columns[0]]))
+            return False
+        values = np.array([float(row[column]) for column in self.columns[1:]])
+        self.cse = self.cse.append(values)[-self.num_ticks:]
+        self.dates = np.append(self.dates, row[self.columns[0]])[
+                     -self.num_ticks:]
+        self.normalization()
+        self.log.info('Appended tick for <{}> to cache'.format(
+            self.last_date))
+        return True
+
+    def normalization(self):
+        """ Update the min and max values of the ticks in the cache """
+        self.min_value = self.cse.values.min()
+        self.max_value = self.cse.values.max()
+
+    def update(self) -> 'CSECache':
+        """
+        Bring the cache up to date with the OHLC file. If it already has the
+        latest tick in the file, it is used as it is; if it is missing some
+        of the latest ticks, only those are encoded, and otherwise it is
+        built again from the file.
+        """
+        if self.load() is True and \
+                self.last_date == last.row_date(self.ohlc_file):
+            return self
+
+        df = pd.read_csv(self.ohlc_file, delimiter=self.params.delimiter)
+        if self.dates is None or \
+                self.last_date not in df[self.columns[0]].values:
+            self.build(df)
+        else:
+            date_column = df[self.columns[0]]
+            new_rows = df[date_column.astype(str) > str(self.last_date)]
+            for row in new_rows.to_dict(orient='records'):
+                self.append(row)
+        self.save()
+        return self
+
+    def ticks(self) -> DataFrame:
+        """ The ticks in the cache, with the columns of the OHLC file """
+        df = pd.DataFrame(self.cse.values, columns=self.columns[1:])
+        df.insert(loc=0, column=self.columns[0], value=self.dates)
+        return df
+
+    def ohlc(self, ticks) -> DataFrame:
+        """
+        The ticks in the cache normalized, as `Ticks.read_ohlc` returns them,
+        setting the min and max values of `ticks` to those of the cache.
+        :param ticks: the Ticks object used to scale back predictions.
+        """
+        ticks.min_value = self.min_value
+        ticks.max_value = self.max_value
+        df = pd.DataFrame(ticks.normalize(self.cse.values),
+                          columns=['o', 'h', 'l', 'c'])
+        df.insert(loc=0, column=self.columns[0], value=self.dates)
+        return df
+
+    def save(self):
+        state = {
+            'columns': self.columns,
+            'dates': self.dates,
+            'values': self.cse.values,
+            'movement': {name: getattr(self.cse, name)
+                         for name in CSEArray.movement_arrays()},
+            'min_value': self.min_value,
+            'max_value': self.max_value}
+        with open(self.filename, 'wb') as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        self.log.debug('Saved CSE cache to: {}'.format(self.filename))
+
+    def load(self) -> bool:
+        """
+        Load the cache, encoding its ticks with the current parameters.
+        :return: False if there was no cache for the OHLC file, or it was
+            saved in an older format.
+        """
+        if not exists(self.filename):
+            return False
+        with open(self.filename, 'rb') as f:
+            state = pickle.load(f)
+        if not isinstance(state, dict):
+            self.log.warn('Outdated CSE cache in {}'.format(self.filename))
+            return False
+        self.columns, self.dates = state['columns'], state['dates']
+        self.cse = CSEArray(self.params, state['values'])
+        for name, array in state['movement'].items():
+            setattr(self.cse, name, array)
+        self.min_value = state['min_value']
+        self.max_value = state['max_value']
+        self.log.debug('Loaded CSE cache from: {}'.format(self.filename))
+        return True
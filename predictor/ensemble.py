@@ -1,38 +1,59 @@
 import re
 from os.path import splitext, basename
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame, Series
 
 from cs_dictionary import CSDictionary
 from file_io import save_dataframe
 from logger import Logger
+from winner_counts import WinnerCounts
 
 
 class Ensemble:
     num_preds = 0
     net_names = []
 
-    def __init__(self, params: CSDictionary):
+    def __init__(self, params: CSDictionary, predictions: Series = None):
+        """
+        Compute the ensemble of the predictions from all networks.
+        :param params: the predictor parameters
+        :param predictions: the latest predictions from each network, for a
+            single ensemble. If None, they are read from the json file. When
+            passed, the result is only kept in `ensemble_data`, and not
+            displayed nor saved.
+        """
         self.params = params
         self.log: Logger = params.log
 
         self.log.info(
             'Generating ensemble with: {}'.format(self.params.input_file))
-        self.ensemble_predictions(single_ensemble=self.params.ensemble)
+        self.ensemble_data = self.ensemble_predictions(
+            single_ensemble=self.params.ensemble, predictions=predictions)
+        if predictions is None:
+            self.output(self.ensemble_data, self.params.ensemble)
 
-    def ensemble_predictions(self, single_ensemble: bool):
-        df = self.read_predictions_file()
-        weights = self.compute_weights(df)
+    def ensemble_predictions(self, single_ensemble: bool,
+                             predictions: Series = None) -> DataFrame:
         if single_ensemble:
-            json_predictions = pd.DataFrame(
-                pd.read_json(self.params.json_prediction,
-                             typ='series', orient='records')).T
+            if predictions is None:
+                predictions = pd.read_json(self.params.json_prediction,
+                                           typ='series', orient='records')
             ensemble_data = self.compute_weighted_prediction(
-                json_predictions,
-                weights)
+                pd.DataFrame(predictions).T,
+                self.latest_weights())
         else:
+            df = self.read_predictions_file()
+            weights = self.compute_weights(df)
+            if self.params.ensemble_weights.method != 'all':
+                # Weight each prediction only with the winners before it.
+                weights = weights.shift(1)
             ensemble_data = self.compute_weighted_prediction(df, weights)
+        return ensemble_data
+
+    def output(self, ensemble_data: DataFrame, single_ensemble: bool):
+        """ Save or display the ensemble, as set in the parameters """
         if self.params.save_predictions:
             self.save_ensemble(ensemble_data)
         else:
@@ -50,45 +71,89 @@ class Ensemble:
                     self.params.json_forecast))
                 print(to_show.to_string())
 
-    def read_predictions_file(self) -> DataFrame:
+    def read_predictions_file(self, nrows: int = None) -> DataFrame:
+        """
+        Read the predictions file, and the names of the networks in it.
+        :param nrows: the nr. of rows to read. All of them if None.
+        """
         self.log.debug(
             'Reading predictions file: {}'.format(self.params.input_file))
         df = pd.read_csv(self.params.input_file,
-                         delimiter=self.params.delimiter)
+                         delimiter=self.params.delimiter, nrows=nrows)
         if 'avg' in df.columns:
             self.num_preds = df.columns.get_loc('avg') - 1
         else:
             self.log.error('Column called <avg> not present in pred_ file')
+        # Take only the names of the networks
+        from_position = list(df.columns).index('actual') + 1
+        self.net_names = df.columns[from_position:self.num_preds + 1]
+        self.log.debug('Network names: {}'.format(self.net_names))
         return df
 
+    def latest_weights(self) -> Series:
+        """
+        The weight of each network for a new prediction. When they are
+        counted over all the predictions, they are taken from the winner
+        counts kept by the updater (see `WinnerCounts`), reading only the
+        header of the predictions file.
+        """
+        if self.params.ensemble_weights.method != 'all':
+            return self.compute_weights(self.read_predictions_file()).iloc[-1]
+        self.read_predictions_file(nrows=0)
+        return WinnerCounts(self.log, self.params.input_file).update(
+            self.params.delimiter).weights(self.net_names)
+
     def compute_weights(self, preds: DataFrame) -> DataFrame:
+        """
+        The weight of each network, from the nr. of times it was the winner
+        in the predictions file. As set in `ensemble_weights.method`, they
+        are counted over all the predictions ('all'), over the last `window`
+        ones ('rolling'), or decaying exponentially, with a half-life of
+        `halflife` predictions ('decay').
+        :param preds: the predictions file, as read by
+            `read_predictions_file`.
+        :return: the weights after each prediction, with one column per
+            network. With 'all', they are the same for every prediction.
+        """
         self.log.debug('Computing weights from different networks')
-        # Take only the names of the networks
-        from_position = list(preds.columns).index('actual') + 1
-        self.net_names = preds.columns[from_position:self.num_preds + 1]
-        self.log.debug('Network names: {}'.format(self.net_names))
-        # Compute proportions
-        proportions = preds.winner.value_counts()
-        weights = pd.DataFrame({'proportion': proportions,
-                                'weight': pd.Series(index=proportions.index)})
-        weights.weight = weights.proportion / weights.proportion.sum()
-        return weights
+        # Count the wins, as one column per winner, and compute proportions
+        wins = pd.get_dummies(preds.winner, dtype=float)
+        method = self.params.ensemble_weights.method
+        if method == 'all':
+            counts = pd.DataFrame(
+                np.broadcast_to(wins.sum().values, wins.shape),
+                index=wins.index, columns=wins.columns)
+        elif method == 'rolling':
+            counts = wins.rolling(self.params.ensemble_weights.window,
+                                  min_periods=1).sum()
+        elif method == 'decay':
+            counts = wins.ewm(
+                halflife=self.params.ensemble_weights.halflife).mean()
+        else:
+            raise ValueError('Unknown ensemble weights method: {}'.format(
+                method))
+        weights = counts.div(counts.sum(axis=1), axis=0)
+        return weights.reindex(columns=self.net_names, fill_value=0.)
 
-    def compute_weighted_prediction(self, df, weights):
+    def compute_weighted_prediction(self, df: DataFrame, weights):
+        """
+        Add the weighted average of the predictions of the networks, in
+        'w_avg'. Networks without a prediction are left out of the average.
+        :param df: the predictions, with a column per network.
+        :param weights: the weights of the networks, as a series to weight
+            all the predictions with, or a data frame with the weights for
+            each prediction. Those without weights get the same for all.
+        :return: a copy of the predictions, with the average.
+        """
         self.log.debug('Computing final weighted prediction')
         preds = df.copy(deep=True)
-
-        def weighted_prediction(x: Series):  # , weights: DataFrame):
-            w = weights.reindex(list(x.index)).weight
-            x_w = x * w
-            self.log.debug(
-                'Weighting X·W = {}·{} = {}'.format(
-                    x.values, w.values, x_w.values))
-            self.log.debug('sum(X·W) = {}'.format(x_w.sum()))
-            return x_w.sum()
-
-        preds['w_avg'] = preds[self.net_names].apply(
-            lambda x: weighted_prediction(x), axis=1)
+        values = preds[self.net_names].astype(float).fillna(0.).values
+        weights = weights.fillna(1. / len(self.net_names))
+        self.log.debug('Weights: {}'.format(weights.tail(1).values))
+        if isinstance(weights, Series):
+            preds['w_avg'] = values @ weights.values
+        else:
+            preds['w_avg'] = np.einsum('ij,ij->i', values, weights.values)
 
         return preds
 
@@ -1,6 +1,5 @@
 import numpy as np
 import pandas as pd
-from keras.utils import to_categorical
 
 
 class ValidationError(Exception):
@@ -98,21 +97,19 @@ class OHEncoder(object):
                 data.shape) == 2 else data.shape[0]
             num_states = len(self.states)
             data = data.reshape([num_arrays, num_strings])
+            # Position of each string in the dictionary, and its sign, to
+            # pick the rows of the identity matrix all at once.
             if self.signed is True:
-                transformed = np.empty([num_arrays, num_strings, num_states])
-                for i in range(num_arrays):
-                    for j in range(num_strings):
-                        code = to_categorical(
-                            self.dictionary[data[i][j][1:]],
-                            num_classes=len(self.states))
-                        sign = self.sign_dict[data[i][j][0].lower()]
-                        transformed[i][j] = np.dot(code, sign)
+                index = [[self.dictionary[string[1:]] for string in strings]
+                         for strings in data]
+                sign = np.array([[self.sign_dict[string[0].lower()]
+                                  for string in strings] for strings in data])
             else:
-                transformed = np.array([
-                    to_categorical(
-                        [self.dictionary[x] for x in y],
-                        num_classes=len(self.states)) for y in data
-                ])
+                index = [[self.dictionary[string] for string in strings]
+                         for strings in data]
+                sign = np.ones([num_arrays, num_strings])
+            transformed = np.identity(num_states)[np.array(index, dtype=int)]
+            transformed = transformed * sign[:, :, np.newaxis]
         else:
             raise ValidationError('1D or 2D array expected.', -1)
 
@@ -127,17 +124,16 @@ class OHEncoder(object):
             num_strings = data.shape[1] if len(
                 data.shape) == 2 else data.shape[0]
             data = data.reshape([num_arrays, num_strings])
-            # decode_len = 2 if self.signed else 1
-            decoded = []
-            for i in range(num_arrays):
-                flags = np.isin(data[i], [1, -1])
-                flag_index = np.where(flags)[0][0]
-                invcode = self.inv_dict[flag_index]
-                sign = self.inv_sign[data[i][flag_index]]
-                if self.signed:
-                    decoded.append('{}{}'.format(sign, invcode))
-                else:
-                    decoded.append(invcode)
+            # The position of the first +1/-1 in each array is the code.
+            flags = np.isin(data, [1, -1])
+            if not flags.any(axis=1).all():
+                raise ValidationError('Arrays without a +1/-1 to decode.', -1)
+            flag_index = np.argmax(flags, axis=1)
+            signs = data[np.arange(num_arrays), flag_index]
+            decoded = [self.inv_dict[index] for index in flag_index]
+            if self.signed:
+                decoded = ['{}{}'.format(self.inv_sign[sign], invcode)
+                           for sign, invcode in zip(signs, decoded)]
         else:
             raise ValidationError('1D or 2D array expected.', -1)
         return np.array(decoded)
@@ -16,25 +16,34 @@ def main(argv):
     log: Logger = params.log
 
     from cs_core import CSCore
+    from cse_cache import CSECache
     from ticks import Ticks
 
     if params.ensemble_predictions or params.ensemble:
         ensemble(params)
+    elif params.serve:
+        from cs_server import PredictionServer
+        PredictionServer(params).serve()
     else:
         ticks = Ticks(params)
-        data = ticks.read_ohlc()
         predictor = CSCore(params)
         if params.train:
-            predictor.train(data)
+            data = ticks.read_ohlc()
+            predictor.train(data, (ticks.min_value, ticks.max_value))
         else:
             predictions = None
             nn, encoder = predictor.prepare_predict()
             if params.predict_training:
+                # Normalize as the training data, if the scale was saved.
+                data = ticks.read_ohlc(
+                    scale=predictor.training_scale(encoder))
                 predictions = predictor.predict_training(
                     data, nn, encoder, ticks)
             elif params.predict:
+                # Read the latest ticks, already encoded, from the CSE cache.
+                cache = CSECache(params, params.input_file).update()
                 predictions = predictor.predict_newdata(
-                    data, nn, encoder, ticks)
+                    cache.ohlc(ticks), nn, encoder, ticks, cache.cse)
 
             predictions = predictor.reorder_predictions(predictions, params)
             if params.save_predictions is True:
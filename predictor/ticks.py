@@ -1,6 +1,5 @@
 from os.path import dirname, realpath
 
-import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
@@ -22,34 +21,50 @@ class Ticks:
         return (x * (self.max_value - self.min_value)) + self.min_value
 
     def scale_back(self, df):
-        num_models = len(list(self.params['model_names'].keys()))
-        if num_models == 1:
-            return df.applymap(np.vectorize(self.denormalize))
-        else:
-            scaled = df.loc[:, df.columns != 'winner'].applymap(
-                np.vectorize(self.denormalize))
-            return pd.concat([scaled, df['winner']], axis=1)
+        """ Denormalize all the columns in df, except the 'winner' one """
+        scaled = df.copy()
+        columns = df.columns[df.columns != 'winner']
+        scaled[columns] = self.denormalize(df[columns].values.astype(float))
+        return scaled
 
     def read_ohlc(self,
                   filepath=None,
-                  do_normalize=True) -> DataFrame:
+                  do_normalize=True,
+                  scale=None) -> DataFrame:
         _filepath = self.params.input_file if filepath is None else filepath
 
         filepath = file_exists(_filepath, dirname(realpath(__file__)))
-        df = pd.read_csv(filepath, delimiter=self.params.delimiter)
+        df = self.prepare_ohlc(
+            pd.read_csv(filepath, delimiter=self.params.delimiter),
+            do_normalize, scale)
+
+        info_msg = 'Read ticks file: {}, output DF dim{}'
+        self.log.info(info_msg.format(self.params.input_file, df.shape))
+        return df
+
+    def prepare_ohlc(self, df: DataFrame, do_normalize=True,
+                     scale=None) -> DataFrame:
+        """
+        Select and rename the OHLC columns of a data frame read from an OHLC
+        file, normalizing them if requested.
+        :param df: the data frame, with the columns named as in the file
+        :param do_normalize: whether to normalize values to [0, 1]
+        :param scale: the min and max values to normalize with, instead of
+            those in df, like the ones stored in the encoders when trained.
+        :return: the date column and the o, h, l, c columns.
+        """
         date_column = df[self.params.csv_dict['d']]
         # Reorder and rename
         df = df[[self.params.csv_dict['o'], self.params.csv_dict['h'],
                  self.params.csv_dict['l'], self.params.csv_dict['c']]]
         df.columns = ['o', 'h', 'l', 'c']
 
-        self.max_value = df.values.max()
-        self.min_value = df.values.min()
+        if scale is None:
+            self.min_value, self.max_value = df.values.min(), df.values.max()
+        else:
+            self.min_value, self.max_value = scale
         if do_normalize is True:
-            df = df.applymap(np.vectorize(self.normalize))
-
-        info_msg = 'Read ticks file: {}, output DF dim{}'
-        self.log.info(info_msg.format(self.params.input_file, df.shape))
+            df = self.normalize(df)
         return pd.concat((date_column, df), axis=1)
 
     @staticmethod
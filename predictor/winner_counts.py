@@ -0,0 +1,104 @@
+import json
+from os.path import splitext
+
+import numpy as np
+import pandas as pd
+from pandas import Series
+
+from file_io import read_json
+from last import last
+
+
+class WinnerCounts:
+    """
+    Nr. of times each network was the winner in a predictions file, and the
+    date of the latest prediction counted. They are kept in a small JSON
+    file next to the predictions file (`predictions.csv` ->
+    `predictions.winners.json`), and the updater counts the winner of every
+    row it appends, so that the ensemble weights are read from it, without
+    parsing the whole predictions file.
+    """
+
+    def __init__(self, log, preds_file: str):
+        """
+        :param log: the logger of the module using the counts.
+        :param preds_file: the predictions file the counts are for.
+        """
+        self.log = log
+        self.preds_file = preds_file
+        self.filename = self.state_name(preds_file)
+
+        self.counts = {}
+        self.last_date = None
+
+    @staticmethod
+    def state_name(preds_file: str) -> str:
+        return '{}.winners.json'.format(splitext(preds_file)[0])
+
+    def build(self, delimiter: str = ',') -> 'WinnerCounts':
+        """ Count the winners of all the rows in the predictions file """
+        df = pd.read_csv(self.preds_file, delimiter=delimiter)
+        self.counts = {name: int(count) for name, count in
+                       df.winner.value_counts().items()}
+        self.last_date = None if df.empty else str(
+            df.iloc[-1][last.date_colname(df)])
+        self.log.info('Counted winners of {} predictions in {}'.format(
+            len(df), self.preds_file))
+        return self
+
+    def add(self, row_date: str, winner: str,
+            delimiter: str = ',') -> 'WinnerCounts':
+        """
+        Count the winner of the row just appended to the predictions file.
+        If there were no counts yet, all the rows in the file are counted.
+        :param row_date: the date of the row appended.
+        :param winner: the name of the winner network in that row.
+        :param delimiter: the delimiter used in the predictions file.
+        """
+        if self.load() is False:
+            self.build(delimiter)
+        elif self.last_date is None or str(row_date) > str(self.last_date):
+            self.counts[winner] = self.counts.get(winner, 0) + 1
+            self.last_date = str(row_date)
+        else:
+            self.log.warn('Winner for <{}> already counted'.format(row_date))
+            return self
+        self.save()
+        return self
+
+    def update(self, delimiter: str = ',') -> 'WinnerCounts':
+        """
+        Bring the counts up to date with the predictions file. If they are
+        not for the latest row in the file, all the rows are counted again.
+        """
+        if self.load() is False or \
+                self.last_date != str(last.row_date(self.preds_file)):
+            self.build(delimiter).save()
+        return self
+
+    def weights(self, net_names) -> Series:
+        """
+        The proportion of wins of each of the networks passed, or NaN for
+        all of them if none won yet.
+        """
+        total = sum(self.counts.values())
+        counts = pd.Series(self.counts, dtype=np.float64).reindex(
+            net_names, fill_value=0.)
+        return counts / total if total > 0 else counts * np.nan
+
+    def save(self):
+        with open(self.filename, 'w') as f:
+            json.dump({'last_date': self.last_date, 'counts': self.counts}, f)
+        self.log.debug('Saved winner counts to: {}'.format(self.filename))
+
+    def load(self) -> bool:
+        """
+        Load the counts.
+        :return: False if there were no counts for the predictions file.
+        """
+        state = read_json(self.filename)
+        if state is None:
+            return False
+        self.counts, self.last_date = state['counts'], state['last_date']
+        self.log.debug('Loaded winner counts from: {}'.format(self.filename))
+        return True
@@ -0,0 +1,69 @@
+"""
+Microbenchmark for the market data access done at every step by
+`Environment.update_mkt_price`, comparing the DataFrame indexing used
+before (`iloc` + `columns.index()`) with reads over the arrays that
+`Environment.read_market_data` now extracts once.
+
+    python market_data_cursor.py [num_rows]
+"""
+import sys
+import tempfile
+import time
+from os.path import join
+
+import numpy as np
+import pandas as pd
+
+column_name = {'date': 'date', 'price': 'actual', 'forecast': 'forecast',
+               'green': 'verde', 'blue': 'azul'}
+
+
+def forecast_file(path: str, num_rows: int) -> str:
+    """ Generate a synthetic forecast file with konkorde columns """
+    prices = 100. + np.cumsum(np.random.randn(num_rows))
+    df = pd.DataFrame({
+        'date': pd.date_range('2000-01-01', periods=num_rows).strftime(
+            '%Y-%m-%d'),
+        'actual': prices,
+        'forecast': prices + np.random.randn(num_rows),
+        'verde': np.random.randn(num_rows),
+        'azul': np.random.randn(num_rows)})
+    filename = join(path, 'forecast.csv')
+    df.to_csv(filename, index=False)
+    return filename
+
+
+def dataframe_steps(data: pd.DataFrame) -> float:
+    start = time.time()
+    for t in range(data.shape[0]):
+        col_names = list(data.columns)
+        data.iloc[t, col_names.index(column_name['date'])]
+        data.iloc[t, col_names.index(column_name['price'])]
+        data.iloc[t, col_names.index(column_name['forecast'])]
+        green = data.iloc[t, col_names.index(column_name['green'])]
+        blue = data.iloc[t, col_names.index(column_name['blue'])]
+        green + blue
+    return data.shape[0] / (time.time() - start)
+
+
+def array_steps(data: pd.DataFrame) -> float:
+    start = time.time()
+    dates, prices, forecasts, greens, blues = [
+        np.ascontiguousarray(data[column_name[c]].values)
+        for c in ['date', 'price', 'forecast', 'green', 'blue']]
+    for t in range(data.shape[0]):
+        dates[t], prices[t], forecasts[t]
+        greens[t] + blues[t]
+    return data.shape[0] / (time.time() - start)
+
+
+if __name__ == "__main__":
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data = pd.read_csv(forecast_file(tmp_dir, num_rows))
+    before = dataframe_steps(data)
+    after = array_steps(data)
+    print('{} rows'.format(num_rows))
+    print('DataFrame.iloc...: {:>12,.0f} steps/s'.format(before))
+    print('NumPy arrays.....: {:>12,.0f} steps/s'.format(after))
+    print('Speedup..........: {:>12.1f}x'.format(after / before))
@@ -0,0 +1,75 @@
+"""
+Benchmark of the number of training episodes needed to reach a given
+profit with uniform and with prioritized experience replay. Each mode runs
+a single training of up to `max_episodes` episodes, as a real training
+would, and every `every` episodes the strategy learnt so far is simulated
+over the whole forecast file. The target is reached when the P/L of that
+simulation (budget + value - initial budget) gets to `target_profit`.
+
+Run it from the `trader` directory, with the PYTHONPATH set as in the
+Dockerfile, passing a trader config file and a forecast file:
+
+    python ../resources/benchmarks/prioritized_replay.py \\
+        params.yaml forecast.csv target_profit [max_episodes] [every]
+"""
+import random
+import sys
+import time
+
+from agent import Agent
+from environment import Environment
+from rl_dictionary import RLDictionary
+from vector_simulator import VectorSimulator
+
+
+def episodes_to_profit(config_file, forecast_file, target, max_episodes,
+                       every, prioritized: bool) -> (int, float, float):
+    """
+    Train an agent from scratch until its strategy reaches the target
+    profit, and return the nr. of episodes needed (-1 if not reached within
+    `max_episodes`), the best P/L simulated and the time elapsed.
+    """
+    sys.argv = ['trader.py', 'train', '-c', config_file, '-f', forecast_file,
+                '-e', str(max_episodes), '-d', '2']
+    params = RLDictionary(args=sys.argv)
+    params.experience_replay = True
+    params.prioritized_replay = prioritized
+    random.seed(params.seed)
+    environment = Environment(params)
+    simulator = VectorSimulator(environment)
+    agent = Agent(params)
+    reached = {'episodes': -1, 'best_pnl': float('-inf')}
+
+    def evaluate(episode: int) -> bool:
+        """ Simulate the strategy every `every` episodes """
+        if (episode + 1) % every != 0:
+            return False
+        pnl = simulator.simulate([agent.nn.infer_strategy()])['pnl'][0, -1]
+        reached['best_pnl'] = max(reached['best_pnl'], pnl)
+        if pnl >= target:
+            reached['episodes'] = episode + 1
+            return True
+        return False
+
+    start = time.time()
+    agent.model = agent.nn.create_model()
+    agent.reinforce_learn(environment, episode_end=evaluate)
+    return reached['episodes'], reached['best_pnl'], time.time() - start
+
+
+if __name__ == "__main__":
+    config, forecast, target_profit = sys.argv[1:4]
+    episodes = int(sys.argv[4]) if len(sys.argv) > 4 else 300
+    every_episodes = int(sys.argv[5]) if len(sys.argv) > 5 else 5
+
+    report = []
+    for mode, is_prioritized in [('uniform', False), ('prioritized', True)]:
+        report.append((mode,) + episodes_to_profit(
+            config, forecast, float(target_profit), episodes, every_episodes,
+            is_prioritized))
+
+    print('Episodes to reach a P/L of {}:'.format(target_profit))
+    for mode, episode, best_pnl, elapsed in report:
+        print('  {:<12s} {:>6s} episodes ({:.1f}s), best P/L {:.2f}'.format(
+            mode, str(episode) if episode >= 0 else 'n/a', elapsed,
+            best_pnl))
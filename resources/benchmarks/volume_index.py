@@ -0,0 +1,82 @@
+"""
+Benchmark of the Positive and Negative Volume Index, comparing the row by
+row loop used before with the cumulative sums now in `base_indicators`.
+Before timing them, it checks that both give exactly the same values, for
+the default and other `start_pos`, and with missing and zero volumes.
+
+Run it from the `indicators` directory, with the PYTHONPATH set as in the
+Dockerfile:
+
+    python ../resources/benchmarks/volume_index.py [num_rows ...]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from pandas import Series
+
+from base_indicators import negative_volume_index, positive_volume_index
+
+
+def loop_volume_index(close: Series, volume: Series, start_pos: int,
+                      positive: bool) -> Series:
+    """ The PVI (or NVI) computed row by row, as it was done before """
+    vi = pd.Series(index=close.index, dtype='float64')
+    vi.iloc[:] = 1000.0
+    price_chg = close.pct_change()
+    vol_change = volume.pct_change()
+    for i in range(start_pos, len(vi)):
+        if (vol_change.iloc[i] > 0) if positive else (vol_change.iloc[i] < 0):
+            vi.iloc[i] = vi.iloc[i - 1] + (price_chg.iloc[i] * 100.)
+        else:
+            vi.iloc[i] = vi.iloc[i - 1]
+    return vi
+
+
+def ohlcv(num_rows: int) -> pd.DataFrame:
+    """ Synthetic closing values and volumes """
+    return pd.DataFrame({
+        'close': 100. + np.cumsum(np.random.randn(num_rows)),
+        'volume': np.random.randint(1000, 100000, num_rows).astype(float)})
+
+
+def check_equivalence(num_rows: int = 2000):
+    data = ohlcv(num_rows)
+    data.loc[data.sample(frac=0.05).index, 'volume'] = 0.
+    data.loc[data.sample(frac=0.02).index, 'volume'] = np.nan
+    data.loc[data.sample(frac=0.01).index, 'close'] = np.nan
+    for start_pos in [0, 1, 6, 50, num_rows + 1]:
+        for positive, function in [(True, positive_volume_index),
+                                   (False, negative_volume_index)]:
+            expected = loop_volume_index(data.close, data.volume, start_pos,
+                                         positive)
+            actual = function(data.close, data.volume, start_pos)
+            assert np.array_equal(expected.values, actual.values,
+                                  equal_nan=True), \
+                '{} differs with start_pos={}'.format(actual.name, start_pos)
+    for function in [positive_volume_index, negative_volume_index]:
+        assert function(data.close[:0], data.volume[:0]).empty
+    print('Same values as the loop, for {} rows'.format(num_rows))
+
+
+def timed(function, *args) -> float:
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [1000, 10000, 100000]
+    np.random.seed(1)
+    check_equivalence()
+    print('{:>8}  {:>10}  {:>10}  {:>8}'.format(
+        'rows', 'loop', 'cumsum', 'speedup'))
+    for num_rows in sizes:
+        data = ohlcv(num_rows)
+        before = timed(loop_volume_index, data.close, data.volume, 6, True) + \
+            timed(loop_volume_index, data.close, data.volume, 1, False)
+        after = timed(positive_volume_index, data.close, data.volume) + \
+            timed(negative_volume_index, data.close, data.volume)
+        print('{:>8}  {:>9.4f}s  {:>9.4f}s  {:>7.0f}x'.format(
+            num_rows, before, after, before / after))
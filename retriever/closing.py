@@ -29,23 +29,18 @@ class closing:
         return stock_closing, stock_closing['date']
 
     @staticmethod
-    def csv_row(stock_data: dict,
-                json_columns: list,
-                ohlc_columns: list,
-                json_file: str,
-                log: Logger) -> str:
+    def latest_ohlcv(stock_data: dict,
+                     json_columns: list,
+                     ohlc_columns: list) -> pd.DataFrame:
         """
-        Append the OHLCV data from provider to the OHLCV file used in the
-        project.
+        Build a single row data frame with the OHLCV data from provider, with
+        the columns named and ordered as in the OHLCV file.
 
         :param stock_data:      the dictionary with the data retrieved from
                                 provider (Alpha Vantage)
         :param json_columns:    the columns names that contain the info I want
         :param ohlc_columns:    the column names ordered as in the OHLCV file
-        :param json_file:       the name of the file that will contain the data
-                                in json format
-        :param log:             the logger used to report.
-        :return:                the csv row that is inserted in the OHLCV file
+        :return:                the data frame with the OHLCV values
         """
         sd = stock_data.copy()
         for v in sd.keys():
@@ -61,6 +56,29 @@ class closing:
         # Reorder columns
         latest_ohlcv = latest_ohlcv[ohlc_columns]
         latest_ohlcv.columns = ohlc_columns
+        return latest_ohlcv
+
+    @staticmethod
+    def csv_row(stock_data: dict,
+                json_columns: list,
+                ohlc_columns: list,
+                json_file: str,
+                log: Logger) -> str:
+        """
+        Append the OHLCV data from provider to the OHLCV file used in the
+        project.
+
+        :param stock_data:      the dictionary with the data retrieved from
+                                provider (Alpha Vantage)
+        :param json_columns:    the columns names that contain the info I want
+        :param ohlc_columns:    the column names ordered as in the OHLCV file
+        :param json_file:       the name of the file that will contain the data
+                                in json format
+        :param log:             the logger used to report.
+        :return:                the csv row that is inserted in the OHLCV file
+        """
+        latest_ohlcv = closing.latest_ohlcv(stock_data, json_columns,
+                                            ohlc_columns)
 
         # record the OHLCV values to a temporary json file.
         latest_ohlcv.iloc[-1].to_json(json_file)
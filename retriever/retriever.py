@@ -9,6 +9,7 @@ import sys
 from datetime import datetime
 
 from closing import closing
+from cse_cache import CSECache
 from last import last
 from rt_dictionary import RTDictionary
 
@@ -18,7 +19,6 @@ def main(argv):
     Retrieve the latest stock info about the symbol and check if dates match
     """
     params = RTDictionary(args=argv)
-    log = params.log
 
     # Call the proper service to retrieve stock info.
     stock_data, stock_date = closing.retrieve_stock_data(params)
@@ -26,6 +26,20 @@ def main(argv):
     if params.file is None:
         print(stock_data)
         return
+    retrieve(params, stock_data, stock_date)
+
+
+def retrieve(params, stock_data: dict, stock_date: str) -> dict:
+    """
+    Check that the stock info retrieved is the one for the last working day
+    and append it to the OHLC file.
+    :param params: the retriever parameters
+    :param stock_data: the stock info retrieved from the provider
+    :param stock_date: the date of the stock info
+    :return: the OHLCV values appended, with the names of the columns in the
+        OHLC file, or None if the file already had them.
+    """
+    log = params.log
 
     today = datetime.today().strftime('%Y-%m-%d')
     last_date_in_file = last.row_date(params.file)
@@ -48,7 +62,7 @@ def main(argv):
     elif stock_date == today and last_date_in_file == last_working_day:
         log.warn('Data already in file for date <{}>. Doing nothing'.format(
             last_date_in_file))
-        return
+        return None
 
     # Determine the name of the temporary JSON file, from the stock symbol
     json_file = params.json_file.format(params.symbol)
@@ -58,6 +72,15 @@ def main(argv):
                           params.ohlc_columns, json_file, params.log)
     # Append that CSV row.
     closing.append_to_file(row, params.file, last_working_day, params.log)
+    ohlcv = closing.latest_ohlcv(stock_data, params.json_columns,
+                                 params.ohlc_columns).iloc[-1].to_dict()
+
+    # Encode it into the CSE cache of the file, if it is up to date.
+    cache = CSECache(params, params.file)
+    if cache.load() is True and cache.last_date == last_date_in_file:
+        if cache.append(ohlcv) is True:
+            cache.save()
+    return ohlcv
 
 
 if __name__ == "__main__":
@@ -1,21 +1,22 @@
 import time
-from collections import deque
+from multiprocessing import Pool, current_process
 
 import numpy as np
 import pandas as pd
 
 from common import Common
 from environment import Environment
-from rl_nn import RL_NN
+from experience import Experience, PrioritizedExperience
+from policy import has_policy, load_policy
 from rl_stats import RLStats
+from rollout import init_actor, run_episode
 from spring import spring
 
 
 class Agent(Common):
     configuration = None
     tensorboard = None
-    # TODO: Move Experience to a separate class or reuse Memory.
-    experience = deque(maxlen=20000)
+    experience = None
 
     def __init__(self, configuration):
         self.params = configuration
@@ -24,11 +25,38 @@ class Agent(Common):
         env_params = self.params.environment
 
         self.log.info('Creating agent')
-        self.nn = RL_NN(self.params)
+        if self.params.prioritized_replay is True:
+            self.experience = PrioritizedExperience(
+                max_len=20000, alpha=self.params.per_alpha)
+        else:
+            self.experience = Experience(max_len=20000)
+        self._nn = None
         self.model = None
+        self.q_values = None
 
         self.info_learning_mode(env_params)
 
+    @property
+    def nn(self):
+        """ The Q-learning engine, only created when it is first needed """
+        if self._nn is None:
+            self._nn = self.create_engine()
+        return self._nn
+
+    def create_engine(self):
+        """
+        Build the Q-learning engine set in the `q_engine` parameter: either
+        the Keras deep Q-net (`deep_qnet`, default) or the NumPy Q table
+        (`q_table`). Engines are imported here to avoid loading TensorFlow
+        when it is not needed.
+        """
+        if 'q_engine' in self.params and self.params.q_engine == 'q_table':
+            from rl_table import RL_Table
+            self.log.info('Using tabular Q-learning engine')
+            return RL_Table(self.params)
+        from rl_nn import RL_NN
+        return RL_NN(self.params)
+
     def q_learn(self,
                 env: Environment,
                 fresh_model: bool = True,
@@ -54,7 +82,8 @@ class Agent(Common):
             self.nn.save_model(self.model, env.memory.results)
 
         # Extract the strategy matrix from the model.
-        strategy = self.nn.infer_strategy()
+        self.q_values = self.nn.q_table()
+        strategy = self.nn.infer_strategy(self.q_values)
 
         # Simulate what has been learnt with the data.
         self.simulate(env, strategy)
@@ -63,7 +92,7 @@ class Agent(Common):
         if display_strategy:
             self.display.strategy(self,
                                   env,
-                                  self.model,
+                                  self.q_values,
                                   self.params.num_states,
                                   strategy)
         # Plot metrics?
@@ -74,13 +103,23 @@ class Agent(Common):
 
         return strategy
 
-    def reinforce_learn(self, env: Environment):
+    def reinforce_learn(self, env: Environment, episode_end=None):
         """
         Implements the learning loop over the states, actions and strategies
         to learn what is the sequence of actions that maximize reward.
         :param env: the environment
+        :param episode_end: function called with the episode number after
+            learning each episode. If it returns True, the training stops.
         :return: avg_rewards, avg_loss, avg_mae, last_profit
         """
+        if 'num_actors' in self.params and self.params.num_actors > 1:
+            # Daemonic processes (like pool workers) can not start actors.
+            if not current_process().daemon:
+                return self.parallel_reinforce_learn(env, episode_end)
+            self.log.warn('Running {} actors not possible within a daemonic '
+                          'process, learning sequentially'.format(
+                              self.params.num_actors))
+
         rl_stats = RLStats()
         epsilon = self.params.epsilon
         stop_drop = spring(self.params, env.price_)
@@ -122,13 +161,78 @@ class Agent(Common):
 
             #  Update average metrics
             rl_stats.update(self.params.num_episodes,
-                            env.memory.results.profit.iloc[-1])
+                            env.memory.last('profit'))
 
             # Epsilon decays here
             if epsilon >= self.params.epsilon_min:
                 epsilon *= self.params.decay_factor
                 self.log.debug('Updated epsilon: {:.2f}'.format(epsilon))
 
+            if episode_end is not None and episode_end(episode) is True:
+                break
+
+        return rl_stats.avg_rewards, rl_stats.avg_loss, \
+               rl_stats.avg_mae, rl_stats.avg_profit
+
+    def parallel_reinforce_learn(self, env: Environment, episode_end=None):
+        """
+        Actor/learner version of the learning loop. Episodes are run by
+        `num_actors` processes, each one over its own Environment, following
+        the Q table synced from the model at the start of every round of
+        episodes. Transitions are added to the experience and learnt here, in
+        the order of the episodes, as soon as each one finishes. The results
+        of the last episode are loaded into the memory of `env`, as if it had
+        been run over it, as in the sequential loop.
+        :param env: the environment
+        :param episode_end: function called with the episode number after
+            learning each episode. If it returns True, the training stops.
+        :return: avg_rewards, avg_loss, avg_mae, last_profit
+        """
+        rl_stats = RLStats()
+        epsilon = self.params.epsilon
+        num_actors = self.params.num_actors
+        num_episodes = self.params.num_episodes
+
+        self.log.debug('Loop over {} episodes with {} actors'.format(
+            num_episodes, num_actors))
+        with Pool(num_actors, initializer=init_actor,
+                  initargs=(self.params,)) as pool:
+            stop = False
+            for first in range(0, num_episodes, num_actors):
+                if stop is True:
+                    break
+                # Sync the Q table and prepare one episode per actor, with
+                # epsilon decaying as in the sequential loop.
+                q_table = self.nn.q_table()
+                tasks = []
+                for episode in range(first,
+                                     min(first + num_actors, num_episodes)):
+                    tasks.append((episode, epsilon, q_table,
+                                  episode == num_episodes - 1))
+                    if epsilon >= self.params.epsilon_min:
+                        epsilon *= self.params.decay_factor
+
+                for episode, transitions, profit, results in pool.imap(
+                        run_episode, tasks):
+                    rl_stats.reset()
+                    for episode_step, transition in enumerate(transitions):
+                        self.experience.append(transition)
+                        if self.time_to_learn(episode, episode_step):
+                            loss, mae = self.nn.do_learn(episode, episode_step,
+                                                         self.experience)
+                            rl_stats.step(loss, mae, transition[2])
+
+                    self.display.rl_train_report(
+                        episode, len(transitions), rl_stats.avg_rewards,
+                        rl_stats.last_avg, rl_stats.start)
+                    rl_stats.update(num_episodes, profit)
+                    if results is not None:
+                        env.memory.load(results)
+                    if episode_end is not None and \
+                            episode_end(episode) is True:
+                        stop = True
+                        break
+
         return rl_stats.avg_rewards, rl_stats.avg_loss, \
                rl_stats.avg_mae, rl_stats.avg_profit
 
@@ -211,7 +315,7 @@ class Agent(Common):
         next_state, reward, done, _ = environment.step(action)
 
         # Save the action to the tmp file.
-        last_action = environment.memory.results.iloc[-1]['action']
+        last_action = environment.memory.last('action')
         self.log.info('Last action is: {}'.format(last_action))
         pd.Series({'action': last_action}).to_json(self.params.json_action)
         self.log.info('Saved action to: {}'.format(self.params.json_action))
@@ -233,17 +337,31 @@ class Agent(Common):
         model to continue learning over it.
         :param display_strategy:
         """
-        # create the Keras model and learn, or load it from disk.
-        self.model = self.nn.load_model(self.params.model_file)
-        if retrain is True:
-            self.model = self.nn.compile_model()
-
-        # Extract the strategy matrix from the model.
-        strategy = self.nn.infer_strategy()
+        # If only acting, load the exported policy, if any, without Keras.
+        strategy = None
+        if retrain is False and has_policy(self.params.model_file):
+            q_values, policy = load_policy(self.params.model_file)
+            if len(policy) == self.params.num_states:
+                self.log.info('Loaded policy from disk: {}'.format(
+                    self.params.model_file))
+                self.q_values, strategy = q_values, policy
+            else:
+                self.log.warn('Policy with {} states, expected {}'.format(
+                    len(policy), self.params.num_states))
+
+        if strategy is None:
+            # create the Keras model and learn, or load it from disk.
+            self.model = self.nn.load_model(self.params.model_file)
+            if retrain is True:
+                self.model = self.nn.compile_model()
+
+            # Extract the strategy matrix from the model.
+            self.q_values = self.nn.q_table()
+            strategy = self.nn.infer_strategy(self.q_values)
         if display_strategy:
             self.display.strategy(self,
                                   env,
-                                  self.model,
+                                  self.q_values,
                                   self.params.num_states,
                                   strategy)
         return strategy
@@ -256,7 +374,11 @@ class Agent(Common):
             self.log.info('Preset reward mode {}'.format(
                 '(proport.)' if env_params.proportional_reward is True else ''
             ))
-        if self.params.experience_replay is True:
+        if self.params.experience_replay is True and \
+                self.params.prioritized_replay is True:
+            self.log.info('Prioritized experience replay mode {}'.format(
+                self.params.exp_batch_size))
+        elif self.params.experience_replay is True:
             self.log.info(
                 'Experience replay mode {}'.format(self.params.exp_batch_size))
         else:
@@ -1,48 +1,139 @@
+"""
+Bayesian optimization of the reward parameters of the trader.
+
+Candidate configurations are asked to the optimizer in batches, and each
+batch is evaluated in parallel over a pool of processes, each one with its
+own Environment and Agent. Every evaluated point is appended to a results
+file, which is read back at start so that an interrupted search resumes
+without re-running the points already evaluated.
+
+Settings are read from the `bayesopt` section of the parameters file:
+`n_calls` (total nr. of evaluations), `n_workers` (processes) and
+`results_file` (CSV with the points evaluated so far).
+"""
+import csv
+import os
 import sys
+from multiprocessing import Pool
 
-from skopt import gp_minimize
+from skopt import Optimizer
 from skopt.space import Real
-from skopt.utils import use_named_args
 
 from agent import Agent
 from environment import Environment
 from rl_dictionary import RLDictionary
 
+# define the space of hyperparameters to search
+search_space = [Real(-1., +1., name='reward_do_nothing'),
+                Real(-1., +1., name='reward_success_buy'),
+                Real(-1., +1., name='reward_positive_sell'),
+                Real(-1., +1., name='reward_negative_sell'),
+                Real(-1., +1., name='reward_failed_buy'),
+                Real(-1., +1., name='reward_failed_sell')]
+
+# The parameters, environment and agent of each worker process.
+worker = {}
+
+
+def init_worker():
+    """ Build the environment and agent used by a worker process """
+    params = RLDictionary(args=sys.argv)
+    # Workers are daemonic, and can not start the processes of the actors.
+    if 'num_actors' in params and params.num_actors > 1:
+        params.log.warn('Workers learn sequentially, ignoring num_actors')
+        params.num_actors = 1
+    worker['params'] = params
+    worker['environment'] = Environment(params)
+    worker['agent'] = Agent(params)
+
+
+def evaluate_model(point: list) -> (list, float):
+    """
+    Train an agent from scratch with the reward parameters passed, and
+    compute the output metric from the resulting portfolio.
+    :param point: the values for each dimension in the search space.
+    :return: the point and the value of the objective function (to minimize)
+    """
+    params = worker['params']
+    environment = worker['environment']
+    agent = worker['agent']
+    for dimension, value in zip(search_space, point):
+        params.log.info('Setting {} to {:.2f}'.format(dimension.name, value))
+        params.environment[dimension.name] = value
+
+    # calculate the output metric from the model
+    agent.experience.clear()
+    agent.q_learn(environment, fresh_model=True)
+    portfolio = environment.portfolio
+    total = portfolio.budget + portfolio.portfolio_value
+    estimate = total / (portfolio.budget * 1.5)
+    params.log.info('Estimate got (not inverse): {:.3f}'.format(estimate))
+    return point, float(1.0 - estimate)
+
+
+def read_results(filename: str) -> (list, list):
+    """
+    Read the points already evaluated, and their objective values.
+    :param filename: the CSV file with the results.
+    :return: the list of points and the list of objective values.
+    """
+    points, objectives = [], []
+    if not os.path.exists(filename):
+        return points, objectives
+    with open(filename) as results_file:
+        for row in csv.DictReader(results_file):
+            points.append(
+                [float(row[dimension.name]) for dimension in search_space])
+            objectives.append(float(row['objective']))
+    return points, objectives
+
+
+def save_result(filename: str, point: list, objective: float):
+    """ Append an evaluated point to the results file """
+    new_file = not os.path.exists(filename)
+    with open(filename, 'a') as results_file:
+        writer = csv.writer(results_file)
+        if new_file:
+            writer.writerow(
+                [dimension.name for dimension in search_space] + ['objective'])
+        writer.writerow(list(point) + [objective])
+
+
 if __name__ == "__main__":
     # Init
     params = RLDictionary(args=sys.argv)
-    environment = Environment(params)
-    agent = Agent(params)
-
-    # define the space of hyperparameters to search
-    search_space = [Real(-1., +1., name='reward_do_nothing'),
-                    Real(-1., +1., name='reward_success_buy'),
-                    Real(-1., +1., name='reward_positive_sell'),
-                    Real(-1., +1., name='reward_negative_sell'),
-                    Real(-1., +1., name='reward_failed_buy'),
-                    Real(-1., +1., name='reward_failed_sell')]
-
-    # define the function used to evaluate a given configuration
-    @use_named_args(search_space)
-    def evaluate_model(**new_params):
-        # something
-        for k in new_params:
-            params.log.info('Setting {} to {:.2f}'.format(k, new_params[k]))
-            params.environment[k] = new_params[k]
-
-        # calculate the output metric from the model
-        strategy = agent.q_learn(environment, fresh_model=True, do_plot=False)
-        portfolio = environment.portfolio
-        total = portfolio.budget + portfolio.portfolio_value
-        estimate = total / (portfolio.budget * 1.5)
-        params.log.info('Estimate got (not inverse): {:.3f}'.format(estimate))
-        return 1.0 - estimate
-
-
-    # perform optimization
-    result = gp_minimize(evaluate_model, search_space)
+    settings = params.bayesopt if 'bayesopt' in params else {}
+    n_calls = settings.get('n_calls', 100)
+    n_workers = settings.get('n_workers', os.cpu_count())
+    results_name = settings.get('results_file', 'bayesopt_results.csv')
+
+    # Resume from the points already evaluated, if any.
+    optimizer = Optimizer(search_space)
+    points, objectives = read_results(results_name)
+    if points:
+        params.log.info('Resuming from {} points in {}'.format(
+            len(points), results_name))
+        optimizer.tell(points, objectives)
+
+    # perform optimization, evaluating a batch of points in parallel
+    with Pool(n_workers, initializer=init_worker) as pool:
+        while len(objectives) < n_calls:
+            batch = optimizer.ask(
+                n_points=min(n_workers, n_calls - len(objectives)))
+            batch_points, batch_objectives = [], []
+            for point, objective in pool.imap_unordered(evaluate_model, batch):
+                save_result(results_name, point, objective)
+                batch_points.append(point)
+                batch_objectives.append(objective)
+            optimizer.tell(batch_points, batch_objectives)
+            points += batch_points
+            objectives += batch_objectives
+            params.log.info('Evaluated {}/{} points'.format(
+                len(objectives), n_calls))
+
     # summarizing finding:
-    params.log.info('Best Performance: %.3f' % (1.0 - result.fun))
-    params.log.info('Best Parameters:', result.x)
-    for i in range(6):
-        print(result.x[i])
+    best = objectives.index(min(objectives))
+    params.log.info('Best Performance: %.3f' % (1.0 - objectives[best]))
+    params.log.info('Best Parameters: {}'.format(points[best]))
+    for i in range(len(search_space)):
+        print(points[best][i])
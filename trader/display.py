@@ -26,12 +26,12 @@ class Display(Common):
         self.log: Logger = self.params.log
 
     @staticmethod
-    def strategy(trader, env, model, num_states, strategy):
+    def strategy(trader, env, q_table, num_states, strategy):
         """
         Displays the strategy resulting from the learning process.
         :param trader:
         :param env:
-        :param model:
+        :param q_table: the (num_states x num_actions) array of Q values
         :param num_states:
         :param strategy:
         :return:
@@ -42,8 +42,8 @@ class Display(Common):
         for i in range(num_states):
             print(strategy_string.format(
                 env.states.name(i),
-                trader.configuration.action_name[strategy[i]],
-                model.predict(np.identity(num_states)[i:i + 1])))
+                trader.params.action_name[strategy[i]],
+                q_table[i:i + 1]))
         print()
 
     def summary(self, results: DataFrame, totals=True, do_plot=False) -> None:
@@ -16,6 +16,11 @@ class Environment(Common):
     configuration = None
     max_states_ = 0
     data_ = None
+    dates_ = None
+    prices_ = None
+    forecasts_ = None
+    greens_ = None
+    blues_ = None
     current_state_ = 0
     t = 0
     portfolio = None
@@ -31,13 +36,12 @@ class Environment(Common):
     new_state_: int = 0
     have_konkorde = False
     date_colname = 'date'
+    state_classes_ = []
 
     def __init__(self, configuration):
         self.params = configuration
         self.log = self.params.log
         self.display = self.params.display
-        self.memory = Memory(self.params)
-        self.results = self.memory.results
         self.log.info('Creating Environment')
 
         if 'seed' in self.params:
@@ -46,7 +50,9 @@ class Environment(Common):
             np.random.seed(1)
 
         self.states = StatesCombiner(self.params)
+        self.state_classes_ = self.resolve_state_classes()
         self.read_market_data(self.params.forecast_file)
+        self.memory = Memory(self.params, self.max_states_)
         self.portfolio = Portfolio(self.params,
                                    self.price_, self.forecast_, self.memory)
         self.init_environment(creation_time=True)
@@ -103,32 +109,58 @@ class Environment(Common):
             self.params.have_konkorde = True
             self.log.info('Konkorde index present!')
 
+        # Extract the columns read at every step into contiguous arrays, to
+        # avoid indexing the DataFrame on each iteration.
+        self.dates_ = self.column_values(self.date_colname_)
+        self.prices_ = self.column_values(self.params.column_name['price'])
+        self.forecasts_ = self.column_values(
+            self.params.column_name['forecast'])
+        if self.params.have_konkorde:
+            self.greens_ = self.column_values(self.params.column_name['green'])
+            self.blues_ = self.column_values(self.params.column_name['blue'])
+
+    def column_values(self, column_name) -> np.ndarray:
+        """
+        Returns the values of a column in the market data as a contiguous
+        NumPy array.
+        :param column_name: the name of the column in the data read.
+        :return: the array of values
+        """
+        return np.ascontiguousarray(self.data_[column_name].values)
+
     def update_mkt_price(self):
         """
         Set the price to the current time slot.
         """
         assert self.data_ is not None, 'Price series data has not been read yet'
-        col_names = list(self.data_.columns)
 
-        self.ts_ = self.data_.iloc[self.t, col_names.index(self.date_colname_)]
-        self.price_ = self.data_.iloc[
-            self.t, col_names.index(self.params.column_name['price'])]
-        self.forecast_ = self.data_.iloc[
-            self.t, col_names.index(self.params.column_name['forecast'])]
+        self.ts_ = self.dates_[self.t]
+        self.price_ = self.prices_[self.t]
+        self.forecast_ = self.forecasts_[self.t]
 
         self.log.debug('  t={}, updated market price/forecast ({}/{})'.format(
             self.t, self.price_, self.forecast_))
 
         # If I do have konkorde indicators, I also read them.
         if self.params.have_konkorde:
-            self.green_ = self.data_.iloc[
-                self.t, col_names.index(self.params.column_name['green'])]
-            self.blue_ = self.data_.iloc[
-                self.t, col_names.index(self.params.column_name['blue'])]
+            self.green_ = self.greens_[self.t]
+            self.blue_ = self.blues_[self.t]
             self.konkorde_ = self.green_ + self.blue_
             self.log.debug('  konkorde ({}/{})'.format(
                 self.green_, self.blue_))
 
+    def resolve_state_classes(self) -> list:
+        """
+        Get the classes implementing each of the sub-states defined in the
+        parameters file, in the same order used by the StatesCombiner.
+        :return: the list of classes
+        """
+        # The extended classes are defined in the params file and their name
+        # must start with the 'State' string.
+        module = importlib.import_module('state_classes')
+        return [getattr(module, 'State' + module_param_name)
+                for module_param_name in self.params.state.keys()]
+
     @staticmethod
     def decide_next_action(state, strategy):
         return strategy[state]
@@ -140,15 +172,8 @@ class Environment(Common):
         """
         # Iterate through the list of states defined in the parameters file
         # and call the update_state() static method in them.
-        new_substates = []
-        for module_param_name in self.params.state.keys():
-            # The extended classes are defined in the params file and must
-            # start with the 'state_' string.
-            module_name = 'State' + module_param_name
-            module = importlib.import_module('state_classes')  # module_name)
-            state_class = getattr(module, module_name)
-            new_substate = state_class.update_state(self.portfolio)
-            new_substates.append(new_substate)
+        new_substates = [state_class.update_state(self.portfolio)
+                         for state_class in self.state_classes_]
 
         # Get the ID resulting from the combination of the sub-states
         self.current_state_ = self.states.get_id(*new_substates)
@@ -244,8 +269,8 @@ class Environment(Common):
         for portfolio_local in merged_dict['portfolio'].keys():
             self.portfolio.__dict__[portfolio_local] = merged_dict['portfolio'][
                 portfolio_local]
-        self.memory.results = pd.DataFrame.from_dict(merged_dict['memory'],
-                                                     orient='index')
+        self.memory.load(pd.DataFrame.from_dict(merged_dict['memory'],
+                                                orient='index'))
         self.log.info('Retrieved portfolio and memory from: {}'.format(
             self.params.portfolio_name))
 
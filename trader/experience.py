@@ -0,0 +1,196 @@
+import random
+
+import numpy as np
+
+
+class Experience:
+    """
+    Ring buffer with the last `max_len` transitions experienced by the agent,
+    stored in a preallocated structured NumPy array. Minibatches are
+    returned as structured arrays, with one field per element of the
+    transition: state, action, reward, next_state and done.
+    """
+    dtype = np.dtype([('state', np.int64),
+                      ('action', np.int64),
+                      ('reward', np.float64),
+                      ('next_state', np.int64),
+                      ('done', np.bool_)])
+
+    def __init__(self, max_len: int = 20000):
+        self.max_len = max_len
+        self.buffer = np.zeros(max_len, dtype=self.dtype)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, transition: tuple):
+        """
+        Add a transition, replacing the oldest one if the buffer is full.
+        :param transition: tuple with state, action, reward, next state and
+                           done values.
+        :return: None
+        """
+        self.buffer[(self.start + self.size) % self.max_len] = transition
+        if self.size < self.max_len:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.max_len
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    def indices(self, positions) -> np.ndarray:
+        """
+        Buffer indices of positions counted from the oldest transition.
+        Negative positions count from the newest one, as in Python lists.
+        """
+        return (self.start + np.asarray(positions) % self.size) % self.max_len
+
+    def sample(self, batch_size: int) -> np.ndarray:
+        """
+        Uniform random sample of transitions, without replacement.
+        :param batch_size: the number of transitions to sample.
+        :return: a structured array with the transitions
+        """
+        positions = random.sample(range(self.size), batch_size)
+        return self.buffer[self.indices(positions)]
+
+    def slice(self, start: int, stop: int) -> np.ndarray:
+        """
+        The transitions between two positions, counted from the oldest one.
+        :param start: the first position
+        :param stop: the position after the last one
+        :return: a structured array with the transitions
+        """
+        return self.buffer[self.indices(np.arange(start, stop))]
+
+
+class SumTree:
+    """
+    Binary tree where every node holds the sum of its children, and leaves
+    hold the priority of each position in the experience buffer. Stored in
+    an array of 2 * P elements, with P the first power of two not lower
+    than the capacity, where the root is at index 1 and the children of node
+    `i` are at `2i` and `2i + 1`. Sampling and updates are O(log n).
+    """
+
+    def __init__(self, capacity: int):
+        self.num_leaves = 1
+        while self.num_leaves < capacity:
+            self.num_leaves *= 2
+        self.depth = self.num_leaves.bit_length() - 1
+        self.tree = np.zeros(2 * self.num_leaves)
+
+    @property
+    def total(self) -> float:
+        return self.tree[1]
+
+    def leaves(self, indices) -> np.ndarray:
+        return self.tree[self.num_leaves + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        """
+        Set the priorities of the leaves passed, and the sums above them.
+        :param indices: array of leaf indices
+        :param priorities: array with the new priority of each leaf
+        :return: None
+        """
+        nodes = self.num_leaves + np.asarray(indices)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values) -> np.ndarray:
+        """
+        Find the leaves where each of the values passed falls, when the
+        leaves are laid out consecutively, each spanning its priority.
+        :param values: array of values in [0, total)
+        :return: array of leaf indices
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(values.shape[0], dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            go_right = values >= self.tree[left]
+            values = np.where(go_right, values - self.tree[left], values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.num_leaves
+
+    def clear(self):
+        self.tree[:] = 0.
+
+
+class PrioritizedExperience(Experience):
+    """
+    Experience buffer for prioritized experience replay (Schaul et al.,
+    2015). Transitions are sampled proportionally to their priority, which
+    is set from their last TD error, and new transitions are given the
+    maximum priority seen so far.
+    """
+
+    def __init__(self, max_len: int = 20000, alpha: float = 0.6,
+                 min_priority: float = 0.01):
+        super().__init__(max_len)
+        self.alpha = alpha
+        self.min_priority = min_priority
+        self.max_priority = 1.0
+        self.tree = SumTree(max_len)
+
+    def append(self, transition: tuple):
+        index = (self.start + self.size) % self.max_len
+        super().append(transition)
+        self.tree.update([index], [self.max_priority])
+
+    def clear(self):
+        super().clear()
+        self.tree.clear()
+        self.max_priority = 1.0
+
+    @staticmethod
+    def beta(episode: int, num_episodes: int, beta0: float) -> float:
+        """
+        Exponent of the importance-sampling weights, annealed linearly from
+        `beta0` to 1 along the training episodes.
+        :param episode: the current episode.
+        :param num_episodes: the nr. of episodes in the training.
+        :param beta0: the exponent at the first episode.
+        """
+        progress = min(1., episode / num_episodes)
+        return beta0 + (1. - beta0) * progress
+
+    def prioritized_sample(self, batch_size: int, beta: float):
+        """
+        Sample of transitions drawn proportionally to their priority, taking
+        one from each of `batch_size` equal segments of the total priority.
+        :param batch_size: the number of transitions to sample.
+        :param beta: the exponent of the importance-sampling weights.
+        :return: a structured array with the transitions, their indices in
+                 the buffer and their importance-sampling weights.
+        """
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) +
+                  np.random.random(batch_size)) * segment
+        indices = self.tree.find(values)
+        # Rounding in the sums can send a value past the last written leaf.
+        last_written = (self.start + self.size - 1) % self.max_len
+        indices[self.tree.leaves(indices) == 0] = last_written
+        probabilities = self.tree.leaves(indices) / self.tree.total
+        weights = np.power(self.size * probabilities, -beta)
+        weights /= weights.max()
+        return self.buffer[indices], indices, weights
+
+    def update_priorities(self, indices, td_errors):
+        """
+        Set the priorities of the transitions passed from their TD errors.
+        :param indices: the indices in the buffer of the transitions.
+        :param td_errors: the TD error of each transition.
+        :return: None
+        """
+        priorities = np.power(np.abs(td_errors) + self.min_priority,
+                              self.alpha)
+        self.tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, priorities.max())
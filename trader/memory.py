@@ -1,17 +1,56 @@
-from pandas import DataFrame, Series
+import numpy as np
+from pandas import DataFrame
 
 
 # TODO Hacer esta clase generica para poder manejar varios dataframes
 
 class Memory:
+    # Columns from `table_headers` that do not hold numbers. Every other
+    # column is stored as a float, except those listed as integers.
+    text_columns = ['ts', 'action', 'state_desc']
+    int_columns = ['t', 'state']
+    min_capacity = 16
 
-    def __init__(self, configuration):
+    def __init__(self, configuration, max_len: int = 0):
         self.params = configuration
-        # Create a DataFrame within the configuration to store all the values
-        # that are relevant to later perform data analysis.
+        # Store all the values that are relevant to later perform data
+        # analysis in a set of preallocated NumPy arrays, one per column.
         # The YAML file contains the column names in a parameter called
-        # table_headers.
-        self.results = DataFrame(columns=self.params.table_headers)
+        # table_headers. The `results` DataFrame is only built on demand.
+        self.headers = list(self.params.table_headers)
+        self.columns = dict()
+        self.capacity = 0
+        self.num_rows = 0
+        self.allocate(max(max_len, self.min_capacity))
+
+    def allocate(self, capacity: int):
+        """
+        Allocate (or enlarge) the column arrays to hold `capacity` rows,
+        keeping the rows already recorded.
+        :param capacity: the number of rows the memory must be able to hold
+        :return: None
+        """
+        for name in self.headers:
+            column = np.empty(capacity, dtype=self.dtype(name))
+            column[:] = self.default(name)
+            if name in self.columns:
+                column[:self.num_rows] = self.columns[name][:self.num_rows]
+            self.columns[name] = column
+        self.capacity = capacity
+
+    def dtype(self, column_name):
+        if column_name in self.text_columns:
+            return object
+        if column_name in self.int_columns:
+            return np.int64
+        return np.float64
+
+    def default(self, column_name):
+        if column_name in self.text_columns:
+            return None
+        if column_name in self.int_columns:
+            return 0
+        return np.nan
 
     def record_values(self, portfolio, t: int, ts: str):
         """
@@ -21,9 +60,15 @@ class Memory:
         :param ts: the timestamp of the entry
         :return: None
         """
+        if self.num_rows == self.capacity:
+            self.allocate(2 * self.capacity)
         values = [t] + [ts] + portfolio.values_to_record()
-        row = Series(dict(zip(self.params.table_headers, values)))
-        self.results = self.results.append(row, ignore_index=True)
+        row = self.num_rows
+        for name in self.headers:
+            self.columns[name][row] = self.default(name)
+        for name, value in zip(self.headers, values):
+            self.columns[name][row] = value
+        self.num_rows += 1
 
     def record_action(self, action_name):
         """
@@ -31,8 +76,7 @@ class Memory:
         :param action_name:
         :return: None
         """
-        last_index = self.results.shape[0] - 1
-        self.results.loc[last_index, 'action'] = action_name
+        self.columns['action'][self.num_rows - 1] = action_name
 
     def record_reward(self, reward, current_state, description):
         """
@@ -42,33 +86,62 @@ class Memory:
         :param description:
         :return: None
         """
-        last_index = self.results.shape[0] - 1
-        self.results.loc[last_index, 'reward'] = reward
-        self.results.loc[last_index, 'state'] = current_state
-        self.results.loc[last_index, 'state_desc'] = description
+        last_index = self.num_rows - 1
+        self.columns['reward'][last_index] = reward
+        self.columns['state'][last_index] = current_state
+        self.columns['state_desc'][last_index] = description
 
     def reset(self):
-        if self.results.shape[0] > 0:
-            self.results = self.results[0:0]
+        self.num_rows = 0
+
+    def load(self, results: DataFrame):
+        """
+        Replace the contents of the memory with those in the DataFrame
+        passed, typically read from a saved portfolio.
+        :param results: a DataFrame with (some of) the `table_headers` columns
+        :return: None
+        """
+        self.num_rows = 0
+        self.allocate(max(results.shape[0] + 1, self.capacity))
+        for name in self.headers:
+            self.columns[name][:] = self.default(name)
+            if name not in results.columns:
+                continue
+            if name in self.int_columns:
+                column = results[name].fillna(self.default(name))
+            else:
+                column = results[name]
+            self.columns[name][:results.shape[0]] = column.values
+        self.num_rows = results.shape[0]
+
+    @property
+    def results(self) -> DataFrame:
+        """
+        Build a DataFrame view with the rows recorded so far.
+        """
+        return DataFrame(
+            {name: self.columns[name][:self.num_rows].copy()
+             for name in self.headers},
+            columns=self.headers)
 
     def last(self, column_name):
-        if self.len >= 1:
-            return self.results.iloc[-1][column_name]
+        if self.num_rows >= 1:
+            return self.columns[column_name][self.num_rows - 1]
         else:
             return 0.
 
     def prevlast(self, column_name):
-        if self.len >= 2:
-            return self.results.iloc[-2][column_name]
+        if self.num_rows >= 2:
+            return self.columns[column_name][self.num_rows - 2]
         else:
             return 0.
 
     def prevprevlast(self, column_name):
-        if self.len >= 3:
-            return self.results.iloc[-3][column_name]
+        if self.num_rows >= 3:
+            return self.columns[column_name][self.num_rows - 3]
         else:
             return 0.
 
     @property
     def len(self):
-        return self.results.shape[0]
+        return self.num_rows
@@ -0,0 +1,47 @@
+"""
+Compact artifact with the policy learnt by the agent: the strategy (best
+action for each state) and the Q table it comes from, stored as JSON next to
+the model files. Loading it needs neither TensorFlow nor Keras, so that
+`trader.py predict` and `simulate` can skip rebuilding the network.
+"""
+import json
+import os
+
+import numpy as np
+
+
+def policy_name(model_basename: str) -> str:
+    """ Name of the policy file for a model basename (without extension) """
+    return '{}.policy.json'.format(model_basename)
+
+
+def has_policy(model_basename: str) -> bool:
+    return os.path.exists(policy_name(model_basename))
+
+
+def save_policy(model_basename: str, q_table: np.ndarray,
+                strategy: list) -> str:
+    """
+    Save the strategy and Q table of a model.
+    :param model_basename: model basename without extension.
+    :param q_table: the (num_states x num_actions) array of Q values
+    :param strategy: the action to take in each state
+    :return: the name of the file written
+    """
+    filename = policy_name(model_basename)
+    with open(filename, 'w') as policy_file:
+        json.dump({'strategy': [int(action) for action in strategy],
+                   'q_table': np.asarray(q_table).tolist()},
+                  policy_file)
+    return filename
+
+
+def load_policy(model_basename: str) -> (np.ndarray, list):
+    """
+    Load the strategy and Q table of a model.
+    :param model_basename: model basename without extension.
+    :return: the Q table and the strategy
+    """
+    with open(policy_name(model_basename), 'r') as policy_file:
+        policy = json.load(policy_file)
+    return np.array(policy['q_table']), policy['strategy']
@@ -107,6 +107,10 @@ class RLDictionary(Dictionary):
         for tup in zip(range(len(self.action)), self.action):
             self.action_name[tup[0]] = tup[1]
 
+        # Prioritized experience replay is optional in the config file.
+        if 'prioritized_replay' not in self:
+            setattr(self, 'prioritized_replay', False)
+
         # Specific attributes to store number of actions and states.
         setattr(self, 'num_actions', len(self.action))
 
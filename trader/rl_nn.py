@@ -1,5 +1,4 @@
 import os
-import random
 from os.path import splitext, basename
 
 import numpy as np
@@ -16,6 +15,7 @@ from keras.optimizers import Adam
 
 from common import Common
 from file_io import valid_output_name
+from policy import save_policy
 from utils.dictionary import Dictionary
 
 
@@ -26,6 +26,8 @@ class RL_NN(Common):
         self.params = configuration
         self.log = self.params.log
         self.model = None
+        # One-hot encodings of every state, built once and sliced on demand.
+        self.identity = np.identity(self.params.num_states)
 
         self.callback_args = {}
         if self.params.tensorboard is True:
@@ -80,7 +82,7 @@ class RL_NN(Common):
         loss = 0.
         mae = 0.
         if self.params.experience_replay is True:
-            loss, mae = self.experience_replay(memory)
+            loss, mae = self.experience_replay(memory, episode)
         else:
             loss, mae = self.minibatch_learn(memory)
         return loss, mae
@@ -97,36 +99,44 @@ class RL_NN(Common):
             return 0.0, 0.0
 
         self.log.debug('Minibatch learn')
-        mini_batch = np.empty(shape=(0, 5), dtype=np.int32)
-        for i in range(mem_size - self.params.batch_size - 1, mem_size - 1):
-            mini_batch = np.append(
-                mini_batch,
-                np.asarray(memory[i]).astype(int).reshape(1, -1),
-                axis=0)
-        nn_input, nn_output = self.prepare_nn_data(mini_batch)
+        mini_batch = memory.slice(mem_size - self.params.batch_size - 1,
+                                  mem_size - 1)
+        nn_input, nn_output, _ = self.prepare_nn_data(mini_batch)
         h = self.model.fit(
             nn_input, nn_output,
             epochs=1, verbose=0, batch_size=self.params.batch_size,
             **self.callback_args)
         return h.history['loss'][0], h.history['mae'][0]
 
-    def experience_replay(self, memory):
+    def experience_replay(self, memory, episode=0):
         """
         Primarily from: https://github.com/edwardhdlu/q-trader
+        In prioritized replay mode, experiences are sampled according to
+        their priority, and their importance-sampling weights are passed to
+        the fit as sample weights.
         :param memory:
+        :param episode: the current episode, to anneal importance sampling.
         :return: loss and mae.
         """
         if len(memory) <= self.params.exp_batch_size:
             self.log.debug('  Not enough samples in experience memory')
             return 0., 0.
 
-        mini_batch = random.sample(memory,
-                                   self.params.exp_batch_size)
-        nn_input, nn_output = self.prepare_nn_data(mini_batch)
+        weights = None
+        if self.params.prioritized_replay is True:
+            mini_batch, indices, weights = memory.prioritized_sample(
+                self.params.exp_batch_size,
+                memory.beta(episode, self.params.num_episodes,
+                            self.params.per_beta))
+        else:
+            mini_batch = memory.sample(self.params.exp_batch_size)
+        nn_input, nn_output, td_errors = self.prepare_nn_data(mini_batch)
         h = self.model.fit(
-            nn_input, nn_output,
+            nn_input, nn_output, sample_weight=weights,
             epochs=1, verbose=0, batch_size=self.params.exp_batch_size,
             **self.callback_args)
+        if self.params.prioritized_replay is True:
+            memory.update_priorities(indices, td_errors)
         self.log.debug('  Learnt exp. batch, loss/mae: {:.2f}/{:.2f}'.format(
             h.history['loss'][0], h.history['mae'][0]))
         return h.history['loss'][0], h.history['mae'][0]
@@ -134,54 +144,51 @@ class RL_NN(Common):
     def prepare_nn_data(self, mini_batch):
         """
         Shape the input and output (supervised labels) to the network from a
-        minibatch o previous experiences.
-        :param mini_batch:  array of tuples with states, actions, rewards,
-                            next states and done values.
-        :return: input and output to the network.
+        minibatch o previous experiences. The current and next states of the
+        whole minibatch are fed forward at once, and the Bellman update is
+        applied over the arrays of outputs.
+        :param mini_batch:  structured array (see `Experience`) with states,
+                            actions, rewards, next states and done values.
+        :return: input and output to the network, and the TD errors.
         """
-        nn_input = np.empty((0, self.params.num_states), dtype=np.int32)
-        nn_output = np.empty((0, self.params.num_actions))
-        for state, action, reward, next_state, done in mini_batch:
-            y = self.prepare_nn_output(state, action, reward, next_state, done)
-            nn_input = np.append(nn_input, self.onehot(state), axis=0)
-            nn_output = np.append(nn_output, y, axis=0)
-        return nn_input, nn_output
-
-    def prepare_nn_output(self, state, action, reward, next_state, done):
+        nn_input = self.onehot(mini_batch['state'])
+        nn_output = self.model.predict(nn_input)
+        next_values = np.max(
+            self.model.predict(self.onehot(mini_batch['next_state'])), axis=1)
+        targets = np.where(
+            mini_batch['done'],
+            mini_batch['reward'],
+            mini_batch['reward'] + self.params.gamma * next_values)
+        rows = np.arange(mini_batch.shape[0])
+        td_errors = targets - nn_output[rows, mini_batch['action']]
+        nn_output[rows, mini_batch['action']] = targets
+        return nn_input, nn_output, td_errors
+
+    def infer_strategy(self, q_table: np.ndarray = None) -> list:
         """
-        Feed forward the current state to the network to get the output and
-        reformat it to set the reward associated to the action taken and thus
-        learn that state -> reward association for that action.
-        :param state: the state
-        :param action: action
-        :param reward: reward
-        :param next_state: next state
-        :param done: if loop has ended
-        :return: an array of `n` values, where `n` is the nr of actions.
+        Get the defined strategy from the weights of the model, as the best
+        action for each row of the Q table.
+        :param q_table: the Q table, if already computed. Otherwise, it is
+            obtained from the model.
+        :return: strategy matrix
         """
-        target = reward
-        if not done:
-            target = reward + self.params.gamma * self.predict_value(
-                next_state)
-        labeled_output = self.model.predict(self.onehot(state))[0]
-        labeled_output[action] = target
-        y = labeled_output.reshape(-1, self.params.num_actions)
-        return y
-
-    def infer_strategy(self) -> list:
+        if q_table is None:
+            q_table = self.q_table()
+        return list(np.argmax(q_table, axis=1))
+
+    def q_table(self) -> np.ndarray:
         """
-        Get the defined strategy from the weights of the model.
-        :return: strategy matrix
+        Q values of every (state, action) pair, in a single forward pass.
+        :return: a (num_states x num_actions) array
         """
-        strategy = [
-            np.argmax(
-                self.model.predict(self.onehot(i))[0])
-            for i in range(self.params.num_states)
-        ]
-        return strategy
+        return self.model.predict(self.identity)
 
-    def onehot(self, state: int) -> np.ndarray:
-        return np.identity(self.params.num_states)[state:state + 1]
+    def onehot(self, state) -> np.ndarray:
+        """
+        One-hot encoding of a single state, or of an array of states.
+        :return: an array with one row per state
+        """
+        return self.identity[np.atleast_1d(state)]
 
     def predict(self, state) -> int:
         return int(np.argmax(self.model.predict(self.onehot(state))))
@@ -214,6 +221,12 @@ class RL_NN(Common):
         model.save_weights(weights_name)
         self.log.info('  Weights: {}'.format(weights_name))
 
+        # Save the policy, to be loaded later on without Keras
+        q_table = model.predict(self.identity)
+        policy_file = save_policy(model_name.replace('.json', ''), q_table,
+                                  self.infer_strategy(q_table))
+        self.log.info('  Policy: {}'.format(policy_file))
+
         # Save also the results table
         results_name = model_name.replace('.json', '.csv')
         results.to_csv(results_name,
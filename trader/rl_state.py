@@ -1,3 +1,5 @@
+import numpy as np
+
 from common import Common
 from portfolio import Portfolio
 
@@ -15,3 +17,16 @@ class RL_State(Common):
     @staticmethod
     def update_state(portfolio: Portfolio):
         pass
+
+    @classmethod
+    def update_states(cls, portfolios):
+        """
+        Vectorized version of `update_state` over a set of portfolios
+        (`vector_simulator.PortfolioSet`). By default, the sub-state only
+        depends on market data, which is shared by all the portfolios in the
+        set, so it is computed once over its market reference portfolio.
+        Sub-states depending on the portfolio itself must override this.
+        :return: an array with the name of the sub-state for each portfolio
+        """
+        return np.full(portfolios.size, cls.update_state(portfolios.market),
+                       dtype=object)
@@ -0,0 +1,190 @@
+from os.path import splitext, basename
+
+import numpy as np
+
+from common import Common
+from file_io import valid_output_name
+from policy import save_policy
+from utils.dictionary import Dictionary
+
+
+class QTable:
+    """
+    A (states x actions) table of Q values, exposing the `predict` method
+    of a Keras model over one-hot encoded states, so that it can be used
+    wherever the deep Q-net model is expected.
+    """
+
+    def __init__(self, num_states: int, num_actions: int):
+        self.table = np.zeros((num_states, num_actions))
+
+    def predict(self, onehot_states: np.ndarray) -> np.ndarray:
+        return np.dot(onehot_states, self.table)
+
+
+class RL_Table(Common):
+    """
+    Tabular Q-learning engine. It offers the same interface as `RL_NN`, but
+    the Q values of every state/action pair are stored in a NumPy table
+    and learnt with the classic Q-learning update. Selected with
+    `q_engine: q_table` in the parameters file.
+    """
+    model = None
+
+    def __init__(self, configuration: Dictionary):
+        self.params = configuration
+        self.log = self.params.log
+        self.model = None
+        self.lr = self.params.q_table.lr
+
+    def create_model(self) -> QTable:
+        self.model = QTable(self.params.num_states, self.params.num_actions)
+        return self.model
+
+    def compile_model(self):
+        return self.model
+
+    def do_learn(self, episode, episode_step, memory) -> (float, float):
+        """ perform minibatch learning or experience replay """
+        self.log.debug('Time to learn')
+        loss = 0.
+        mae = 0.
+        if self.params.experience_replay is True:
+            loss, mae = self.experience_replay(memory, episode)
+        else:
+            loss, mae = self.minibatch_learn(memory)
+        return loss, mae
+
+    def minibatch_learn(self, memory):
+        """
+        MiniBatch Learning routine.
+        :param memory:
+        :return: loss and mae
+        """
+        mem_size = len(memory)
+        if mem_size < self.params.batch_size:
+            self.log.debug('Not enough samples for minibatch learn, skipping')
+            return 0.0, 0.0
+
+        self.log.debug('Minibatch learn')
+        mini_batch = memory.slice(mem_size - self.params.batch_size - 1,
+                                  mem_size - 1)
+        td_errors = self.update_table(mini_batch)
+        return np.mean(td_errors ** 2), np.mean(np.abs(td_errors))
+
+    def experience_replay(self, memory, episode=0):
+        """
+        Update the table with a random sample of previous experiences. In
+        prioritized replay mode, experiences are sampled according to their
+        priority, and updates are scaled by their importance-sampling weight.
+        :param memory:
+        :param episode: the current episode, to anneal importance sampling.
+        :return: loss and mae.
+        """
+        if len(memory) <= self.params.exp_batch_size:
+            self.log.debug('  Not enough samples in experience memory')
+            return 0., 0.
+
+        if self.params.prioritized_replay is True:
+            mini_batch, indices, weights = memory.prioritized_sample(
+                self.params.exp_batch_size,
+                memory.beta(episode, self.params.num_episodes,
+                            self.params.per_beta))
+            td_errors = self.update_table(mini_batch, weights)
+            memory.update_priorities(indices, td_errors)
+        else:
+            mini_batch = memory.sample(self.params.exp_batch_size)
+            td_errors = self.update_table(mini_batch)
+        loss, mae = np.mean(td_errors ** 2), np.mean(np.abs(td_errors))
+        self.log.debug('  Learnt exp. batch, loss/mae: {:.2f}/{:.2f}'.format(
+            loss, mae))
+        return loss, mae
+
+    def update_table(self, mini_batch, weights=None):
+        """
+        Apply the Q-learning update to the table for every experience in the
+        minibatch, in order.
+        :param mini_batch:  structured array (see `Experience`) with states,
+                            actions, rewards, next states and done values.
+        :param weights:     optional weight of the update of each experience.
+        :return: the array of TD errors.
+        """
+        q = self.model.table
+        if weights is None:
+            weights = np.ones(mini_batch.shape[0])
+        td_errors = []
+        for state, action, reward, next_state, done, weight in zip(
+                mini_batch['state'], mini_batch['action'],
+                mini_batch['reward'], mini_batch['next_state'],
+                mini_batch['done'], weights):
+            target = reward
+            if not done:
+                target = reward + self.params.gamma * np.max(q[next_state])
+            td_error = target - q[state, action]
+            q[state, action] += self.lr * weight * td_error
+            td_errors.append(td_error)
+        return np.asarray(td_errors)
+
+    def infer_strategy(self, q_table: np.ndarray = None) -> list:
+        """
+        Get the defined strategy from the Q table.
+        :param q_table: the Q table, if already computed.
+        :return: strategy matrix
+        """
+        if q_table is None:
+            q_table = self.model.table
+        return list(np.argmax(q_table, axis=1))
+
+    def q_table(self) -> np.ndarray:
+        """
+        Q values of every (state, action) pair.
+        :return: a (num_states x num_actions) array
+        """
+        return self.model.table.copy()
+
+    def predict(self, state) -> int:
+        return int(np.argmax(self.model.table[state]))
+
+    def predict_value(self, state):
+        return np.max(self.model.table[state])
+
+    #
+    # Saving and loading the model
+    #
+
+    def save_model(self, model, results):
+        self.log.info('Saving Q table and results.')
+
+        if self.params.output is not None:
+            fname = self.params.output
+        else:
+            fname = 'rl_model_' + splitext(
+                basename(self.params.forecast_file))[0]
+        table_name = valid_output_name(fname, self.params.models_dir, 'npy')
+
+        np.save(table_name, model.table)
+        self.log.info('  Q table: {}'.format(table_name))
+        policy_file = save_policy(table_name.replace('.npy', ''), model.table,
+                                  self.infer_strategy(model.table))
+        self.log.info('  Policy: {}'.format(policy_file))
+
+        # Save also the results table
+        results_name = table_name.replace('.npy', '.csv')
+        results.to_csv(results_name,
+                       sep=',',
+                       index=False,
+                       header=True,
+                       float_format='%.2f')
+        self.log.info('  Results: {}'.format(results_name))
+
+    def load_model(self, model_basename):
+        """
+        load the Q table
+        :param model_basename: model basename without extension. 'npy' will
+        be added
+        :return: the loaded model
+        """
+        self.model = QTable(self.params.num_states, self.params.num_actions)
+        self.model.table = np.load('{}.npy'.format(model_basename))
+        self.log.info("Loaded Q table from disk: {}.npy".format(model_basename))
+        return self.model
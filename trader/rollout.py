@@ -0,0 +1,58 @@
+"""
+Actor side of the actor/learner training mode (`num_actors` > 1). Every
+actor process runs whole episodes over its own copy of the Environment,
+following an epsilon-greedy policy over the Q table synced from the
+learner, and returns the transitions observed to be learnt by it.
+"""
+import numpy as np
+from pandas import DataFrame
+
+from environment import Environment
+from spring import spring
+
+# The parameters, environment and stop drop spring of each actor process.
+actor = {}
+
+
+def init_actor(configuration):
+    """ Build the environment used by an actor process """
+    actor['params'] = configuration
+    actor['env'] = Environment(configuration)
+    actor['stop_drop'] = spring(configuration, actor['env'].price_)
+
+
+def run_episode(task: tuple) -> (int, list, float, DataFrame):
+    """
+    Run an episode with the epsilon-greedy policy defined by the Q table.
+    :param task: a tuple with the episode number, the value of epsilon, the
+                 (num_states x num_actions) Q table from the learner, and
+                 whether the results of the episode are needed.
+    :return: the episode number, the list of transitions (state, action,
+             reward, next state and done), the profit at the end of it, and
+             the results in the memory of the environment, if requested
+             (None otherwise).
+    """
+    episode, epsilon, q_table, keep_results = task
+    params = actor['params']
+    env = actor['env']
+    stop_drop = actor['stop_drop']
+
+    # Each episode draws its own sequence of random actions.
+    seed = params.seed if 'seed' in params else 1
+    np.random.seed(seed + episode)
+
+    transitions = []
+    state = env.reset()
+    done = False
+    while not done:
+        if np.random.random() < epsilon:
+            action = np.random.randint(0, params.num_actions)
+        else:
+            action = int(np.argmax(q_table[state]))
+        action = stop_drop.correction(action, env)
+        new_state, reward, done, _ = env.step(action)
+        transitions.append((state, action, reward, new_state, done))
+        state = new_state
+
+    results = env.memory.results if keep_results else None
+    return episode, transitions, env.memory.last('profit'), results
@@ -1,5 +1,7 @@
 from math import copysign
 
+import numpy as np
+
 from portfolio import Portfolio
 from rl_state import RL_State
 
@@ -39,24 +41,40 @@ class StateGain(RL_State):
     def update_state(portfolio: Portfolio):
         return 'GAIN' if portfolio.gain else 'LOSE'
 
+    @staticmethod
+    def update_states(portfolios):
+        return np.where(portfolios.gain, 'GAIN', 'LOSE')
+
 
 class StateHaveShares(RL_State):
     @staticmethod
     def update_state(portfolio: Portfolio):
         return 'HAVE' if portfolio.have_shares else 'DONT'
 
+    @staticmethod
+    def update_states(portfolios):
+        return np.where(portfolios.have_shares, 'HAVE', 'DONT')
+
 
 class StateCanBuy(RL_State):
     @staticmethod
     def update_state(portfolio: Portfolio):
         return 'BUY' if portfolio.can_buy else 'NOB'
 
+    @staticmethod
+    def update_states(portfolios):
+        return np.where(portfolios.can_buy, 'BUY', 'NOB')
+
 
 class StateCanSell(RL_State):
     @staticmethod
     def update_state(portfolio: Portfolio):
         return 'SELL' if portfolio.can_sell else 'NOS'
 
+    @staticmethod
+    def update_states(portfolios):
+        return np.where(portfolios.can_sell, 'SELL', 'NOS')
+
 
 class StatePredUpward(RL_State):
     @staticmethod
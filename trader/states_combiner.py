@@ -10,14 +10,22 @@ generating a cartesian product of sub_states. For example:
     # print(states.get_id('EVEN', 'LOSE'))
     # print(states.name(7))
 
+State IDs follow the order of `itertools.product`, so they are the
+mixed-radix number whose digits are the positions of each sub-state within
+its list of names (the first sub-state being the most significant digit).
+That allows computing the ID arithmetically in `get_id`.
 """
 from itertools import product
 
+import numpy as np
+
 
 class StatesCombiner:
     state_list = []
     state = {}
     ivd = {}
+    codes = []
+    strides = []
     nr_substates = 0
     max_id = 0
 
@@ -27,6 +35,7 @@ class StatesCombiner:
 
         list_of_states = self.params.states_list
         self.nr_substates = len(list_of_states)
+        self.state_list = []
         for s in list_of_states:
             self.state_list.append(s)
         self.combine()
@@ -34,11 +43,20 @@ class StatesCombiner:
 
     def combine(self):
         states = [state for state in product(*self.state_list)]
+        self.state = {}
         for i, t in enumerate(states):
             key = '_'.join(t)
             self.state[key] = i
         self.ivd = {v: k for k, v in self.state.items()}
         self.max_id = len(self.state)
+
+        # Code of each sub-state name within its list, and the weight of
+        # each sub-state position in the mixed-radix state ID.
+        self.codes = [{name: code for code, name in enumerate(names)}
+                      for names in self.state_list]
+        self.strides = [1] * self.nr_substates
+        for i in reversed(range(self.nr_substates - 1)):
+            self.strides[i] = self.strides[i + 1] * len(self.state_list[i + 1])
         return self
 
     def get_id(self, *sub_states):
@@ -46,10 +64,33 @@ class StatesCombiner:
             sub_states) == self.nr_substates, \
             'Incorrect nr. of states. Read {}, should be {}'.format(
                 len(sub_states), self.nr_substates)
-        s = '_'.join(sub_states)
-        assert s in self.state, \
-            'The state ({}) does NOT exist in RL set of states'.format(s)
-        return self.state[s]
+        state_id = 0
+        for codes, stride, sub_state in zip(self.codes, self.strides,
+                                            sub_states):
+            assert sub_state in codes, \
+                'The state ({}) does NOT exist in RL set of states'.format(
+                    '_'.join(sub_states))
+            state_id += codes[sub_state] * stride
+        return state_id
+
+    def get_ids(self, *sub_states):
+        """
+        Vectorized version of `get_id`, where each argument is an array with
+        the names of one sub-state for a set of portfolios.
+        :return: an array with the state ID of each portfolio
+        """
+        assert len(
+            sub_states) == self.nr_substates, \
+            'Incorrect nr. of states. Read {}, should be {}'.format(
+                len(sub_states), self.nr_substates)
+        state_ids = np.zeros(len(sub_states[0]), dtype=int)
+        for codes, stride, names in zip(self.codes, self.strides, sub_states):
+            assert np.isin(names, list(codes.keys())).all(), \
+                'Some state in ({}) does NOT exist in RL set of states'.format(
+                    set(names))
+            for name, code in codes.items():
+                state_ids[names == name] += code * stride
+        return state_ids
 
     def name(self, state_id):
         assert state_id in self.ivd, \
@@ -0,0 +1,295 @@
+"""
+Vectorized simulation of a batch of strategies over the same market data.
+Instead of walking one Environment per strategy, the N portfolios are kept
+as arrays in a `PortfolioSet` and advanced together, one time step at a
+time, reproducing the semantics of `Portfolio`, `Environment.step` and
+`spring` (stop drop) in bull and bear modes.
+
+    simulator = VectorSimulator(environment)
+    results = simulator.simulate(strategies)   # N x num_states array
+    results['pnl']                             # N x num_steps array
+
+"""
+import numpy as np
+
+from common import Common
+from environment import Environment
+from memory import Memory
+from portfolio import Portfolio
+
+
+class PortfolioSet:
+    """
+    The state of N portfolios, stored as arrays with the same names used by
+    `Portfolio`. Market data (prices, forecasts, konkorde) is common to all of
+    them, and it is kept in `market`, a regular Portfolio that never
+    trades, which is used to compute the sub-states that depend only on it.
+    """
+
+    def __init__(self, configuration, size: int, market: Portfolio):
+        self.params = configuration
+        self.environment = self.params.environment
+        self.size = size
+        self.market = market
+        self.budget = None
+        self.investment = None
+        self.portfolio_value = None
+        self.net_value = None
+        self.shares = None
+        self.last_investment = None
+        self.latest_price = 0.
+
+    def reset(self, initial_price):
+        self.budget = np.full(self.size, self.environment.initial_budget,
+                              dtype=np.float64)
+        self.investment = np.zeros(self.size)
+        self.portfolio_value = np.zeros(self.size)
+        self.net_value = np.zeros(self.size)
+        self.shares = np.zeros(self.size)
+        self.last_investment = np.zeros(self.size)
+        self.latest_price = initial_price
+
+    def update(self, price):
+        self.portfolio_value = self.shares * price
+        self.latest_price = price
+
+    def buy(self, mask, num_shares: float = 1.0):
+        """
+        Buy shares in the portfolios selected by `mask`, if they have enough
+        budget.
+        :return: the mask of the portfolios where the purchase failed
+        """
+        buy_price = num_shares * self.latest_price
+        failed = mask & (buy_price > self.budget)
+        done = mask & ~failed
+        self.budget[done] -= buy_price
+        self.investment[done] += buy_price
+        self.shares[done] += num_shares
+        self.portfolio_value[done] += buy_price
+        self.net_value[done] = self.compute_portfolio_value()[done]
+        return failed
+
+    def sell(self, mask, num_shares: float = 1.0):
+        """
+        Sell shares in the portfolios selected by `mask`, if they have them.
+        :return: the mask of the portfolios where the sale failed
+        """
+        sell_price = num_shares * self.latest_price
+        failed = mask & (num_shares > self.shares)
+        done = mask & ~failed
+        if self.params.mode == 'bull':
+            self.budget[done] += sell_price
+        else:
+            self.budget[done] += self.last_investment[done] + \
+                                 self.compute_portfolio_value()[done]
+        self.investment[done] -= sell_price
+        self.shares[done] -= num_shares
+        self.portfolio_value[done] -= sell_price
+        self.net_value[done] = self.compute_portfolio_value()[done]
+        return failed
+
+    def values_to_record(self) -> dict:
+        """
+        Same values (and side effect over the investment) than those
+        recorded in memory by `Portfolio.values_to_record`.
+        """
+        net_value = self.compute_portfolio_value() * self.shares
+        self.investment = self.investment * self.shares
+        self.last_investment = self.investment.copy()
+        return {'budget': self.budget.copy(),
+                'investment': self.investment.copy(),
+                'value': self.portfolio_value.copy(),
+                'profit': net_value,
+                'shares': self.shares.copy()}
+
+    def compute_portfolio_value(self):
+        if self.params.mode == 'bear':
+            return self.investment - self.portfolio_value
+        else:
+            return self.portfolio_value - self.investment
+
+    def failed_action(self, actions):
+        """ Vectorized version of `Portfolio.failed_action` """
+        return ((actions == self.params.action.index('buy')) &
+                (self.latest_price > self.budget)) | \
+               ((actions == self.params.action.index('sell')) &
+                (self.shares == 0.))
+
+    @property
+    def gain(self):
+        return (self.portfolio_value - self.investment) >= 0
+
+    @property
+    def have_shares(self):
+        return self.shares > 0
+
+    @property
+    def can_buy(self):
+        return self.budget >= self.latest_price
+
+    @property
+    def can_sell(self):
+        return self.shares > 0.
+
+
+class VectorSimulator(Common):
+    """
+    Simulates N strategies at once over the market data read by an
+    Environment, reusing its arrays of prices and forecasts, its states
+    combiner and the state classes it resolved.
+    """
+    # Actions as performed by the portfolio, including failed ones.
+    action_names = ['wait', 'buy', 'sell', 'f.buy', 'f.sell']
+
+    def __init__(self, environment: Environment):
+        self.env = environment
+        self.params = self.env.params
+        self.log = self.params.log
+        self.memory = Memory(self.params, self.env.max_states_)
+        self.market = Portfolio(self.params,
+                                self.env.prices_[0], self.env.forecasts_[0],
+                                self.memory)
+
+    def simulate(self, strategies) -> dict:
+        """
+        Simulate every strategy over the whole market data.
+        :param strategies: an N x num_states array, where each row is a
+                           strategy, i.e. the action to take in every state.
+        :return: a dict with N x num_steps arrays for the values recorded in
+                 memory ('budget', 'investment', 'value', 'profit', 'shares'),
+                 the 'action' done (index into `action_names`), the 'reward'
+                 obtained, and the 'pnl' (budget + value - initial budget).
+        """
+        strategies = np.atleast_2d(np.asarray(strategies, dtype=int))
+        num_strategies = strategies.shape[0]
+        num_steps = self.env.max_states_
+        rows = np.arange(num_strategies)
+        buy = self.params.action.index('buy')
+        sell = self.params.action.index('sell')
+
+        results = {name: np.zeros((num_strategies, num_steps))
+                   for name in ['budget', 'investment', 'value', 'profit',
+                                'shares', 'reward']}
+        results['action'] = np.zeros((num_strategies, num_steps), dtype=int)
+
+        # Initial position, as in Environment.reset()
+        price, forecast = self.env.prices_[0], self.env.forecasts_[0]
+        self.memory.reset()
+        self.market.reset(price, forecast, self.memory)
+        portfolios = PortfolioSet(self.params, num_strategies, self.market)
+        portfolios.reset(price)
+        self.record(portfolios, results, 0)
+        states = self.update_states(portfolios)
+
+        # Stop drop springs, as in spring.__init__()
+        has_position = np.zeros(num_strategies, dtype=bool)
+        max_value = np.full(num_strategies, price, dtype=np.float64)
+
+        for t in range(num_steps):
+            actions = strategies[rows, states]
+            if self.params.stop_drop is True:
+                actions = self.stop_drop(portfolios, actions, price,
+                                         has_position, max_value)
+
+            # Perform actions, as in Environment.step()
+            done = np.zeros(num_strategies, dtype=int)
+            done[actions == buy] = self.action_names.index('buy')
+            done[actions == sell] = self.action_names.index('sell')
+            failed_buy = portfolios.buy(actions == buy)
+            failed_sell = portfolios.sell(actions == sell)
+            done[failed_buy] = self.action_names.index('f.buy')
+            done[failed_sell] = self.action_names.index('f.sell')
+            results['action'][:, t] = done
+            results['reward'][:, t] = self.decide_reward(portfolios, done)
+
+            if t + 1 >= num_steps:
+                break
+            price = self.env.prices_[t + 1]
+            forecast = self.env.forecasts_[t + 1]
+            konkorde = self.env.konkorde_
+            if self.params.have_konkorde:
+                konkorde = self.env.greens_[t + 1] + self.env.blues_[t + 1]
+            portfolios.update(price)
+            self.market.update(price, forecast, konkorde)
+            states = self.update_states(portfolios)
+            self.record(portfolios, results, t + 1)
+
+        results['pnl'] = results['budget'] + results['value'] - \
+                         self.params.environment.initial_budget
+        return results
+
+    def record(self, portfolios: PortfolioSet, results: dict, t: int):
+        """ Record the values of all portfolios, and the market at time t """
+        for name, values in portfolios.values_to_record().items():
+            results[name][:, t] = values
+        self.memory.record_values(self.market, t, self.env.dates_[t])
+
+    def update_states(self, portfolios: PortfolioSet):
+        """ Vectorized version of `Environment.update_state` """
+        new_substates = [state_class.update_states(portfolios)
+                         for state_class in self.env.state_classes_]
+        return self.env.states.get_ids(*new_substates)
+
+    def stop_drop(self, portfolios: PortfolioSet, actions, price,
+                  has_position, max_value):
+        """
+        Vectorized version of `spring.correction`, updating in place the
+        position and maximum value of the springs of every portfolio.
+        """
+        is_failed_action = portfolios.failed_action(actions)
+
+        # spring.breaks()
+        if self.params.mode == 'bear':
+            better = price < max_value
+        else:
+            better = price >= max_value
+        stretch = has_position & better
+        max_value[stretch] = price
+        ratio = np.abs(max_value - price) / max_value
+        breaks = has_position & ~better & (ratio > self.params.stop_drop_rate)
+        max_value[breaks] = price
+        actions = np.where(breaks, self.params.action.index('sell'), actions)
+
+        # spring.anchor() and spring.release()
+        anchor = ~is_failed_action & (actions == self.params.action.index(
+            'buy'))
+        release = ~is_failed_action & (actions == self.params.action.index(
+            'sell'))
+        has_position[anchor] = True
+        max_value[anchor] = price
+        has_position[release] = False
+        return actions
+
+    def decide_reward(self, portfolios: PortfolioSet, done):
+        """ Vectorized version of `Portfolio.decide_reward` """
+        if self.params.environment.direct_reward is True:
+            return self.direct_reward(portfolios, done)
+        else:
+            return self.preset_reward(portfolios, done)
+
+    def direct_reward(self, portfolios: PortfolioSet, done):
+        net_value = portfolios.compute_portfolio_value()
+        failed = done >= self.action_names.index('f.buy')
+        net_value = np.where(failed, -1. * np.abs(net_value), net_value)
+        net_value = np.where(failed & (net_value == 0.0), -1.0, net_value)
+        with np.errstate(over='ignore', invalid='ignore'):
+            reward = net_value / np.sqrt(1. + np.power(net_value, 2.))
+        wait = done == self.action_names.index('wait')
+        reward = np.where(wait & (portfolios.shares == 0.), -0.05, reward)
+        return np.where(done == self.action_names.index('buy'), 0.0, reward)
+
+    def preset_reward(self, portfolios: PortfolioSet, done):
+        environment = self.params.environment
+        gain_loss = 1.0
+        if environment.proportional_reward is True:
+            gain_loss = np.abs(portfolios.net_value) + 1.0
+        sell_reward = np.where(portfolios.net_value >= 0,
+                               environment.reward_positive_sell * gain_loss,
+                               environment.reward_negative_sell * gain_loss)
+        rewards = np.array([environment.reward_do_nothing,
+                            environment.reward_success_buy,
+                            0.,
+                            environment.reward_failed_buy,
+                            environment.reward_failed_sell])
+        return np.where(done == self.action_names.index('sell'),
+                        sell_reward, rewards[done])
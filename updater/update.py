@@ -2,16 +2,22 @@ import numpy as np
 
 from file_io import read_json
 from last import last
+from winner_counts import WinnerCounts
 
 
 class Update:
 
-    def __init__(self, configuration, action):
+    def __init__(self, configuration, action, **data):
+        """
+        Run the update action passed (predictions or forecast). The values
+        that the action reads from temporary files can be passed instead as
+        keyword arguments, as done by the pipeline orchestrator.
+        """
         self.params = configuration
         self.log = self.params.log
-        getattr(self, action)()
+        self.updated = getattr(self, action)(**data)
 
-    def predictions(self):
+    def predictions(self, preds: dict = None, ohlc: dict = None):
         """
         Take yesterday's OHLC Closing and predictions to update the preds file
         - Opens the file,
@@ -20,10 +26,16 @@ class Update:
         - if there's no file, returns
         - check that latest date doesn't match the one from last working day
         - append a row with the predictions from each network, and the stats
+        :param preds: the predictions made by each network. If None, they are
+            read from the temporary predictions file.
+        :param ohlc: the latest OHLC values. If None, they are read from the
+            temporary OHLC file.
         """
         self.log.info('Updating predictions file: {}'.format(self.params.file))
-        preds = read_json(self.params.tmp_predictions)
-        ohlc = read_json(self.params.tmp_ohlc)
+        if preds is None:
+            preds = read_json(self.params.tmp_predictions)
+        if ohlc is None:
+            ohlc = read_json(self.params.tmp_ohlc)
         if preds is None or ohlc is None:
             self.log.info('No temporary files to be used to update preds.')
             return False
@@ -52,6 +64,8 @@ class Update:
         pred_keys = list(preds.keys())
         pred_values = np.around(np.array([preds[k] for k in preds.keys()]),
                                 decimals=2)
+        winner = pred_keys[whois_nearest(pred_values,
+                                         float(ohlc[close_colname]))]
         # Build the csv row to be added
         csv_row = '{},{}'.format(
             last_ohlc_date, ','.join(map(str, pred_values)))
@@ -60,7 +74,7 @@ class Update:
             np.mean(diff_with(pred_values, np.mean(pred_values))),
             np.median(pred_values),
             np.mean(diff_with(pred_values, np.median(pred_values))),
-            pred_keys[whois_nearest(pred_values, float(ohlc[close_colname]))]
+            winner
         )
 
         # Append the row at the end of the file
@@ -68,14 +82,27 @@ class Update:
             predictions_file.write(csv_row)
             self.log.info(
                 'Predictions file UPDATED for date: {}'.format(last_ohlc_date))
+
+        # Count the winner, for the ensemble weights
+        WinnerCounts(self.log, self.params.file).add(
+            last_ohlc_date, winner, delimiter=self.params.delimiter)
         return True
 
-    def forecast(self):
+    def forecast(self, ohlc: dict = None, ensemble: dict = None,
+                 indicator: dict = None):
+        """
+        Append to the forecast file a row with yesterday's closing, the
+        ensemble forecast and the indicator values. Those not passed as
+        arguments are read from their temporary files.
+        """
         self.log.info('Updating forecast file: {}'.format(self.params.file))
         # Read the temporary files
-        ohlc = read_json(self.params.tmp_ohlc)
-        ensemble = read_json(self.params.tmp_forecast)
-        indicator = read_json(self.params.tmp_indicator)
+        if ohlc is None:
+            ohlc = read_json(self.params.tmp_ohlc)
+        if ensemble is None:
+            ensemble = read_json(self.params.tmp_forecast)
+        if indicator is None:
+            indicator = read_json(self.params.tmp_indicator)
         if ohlc is None or ensemble is None or indicator is None:
             self.log.info('NOT updating forecast. Missing files.')
             return False
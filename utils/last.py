@@ -1,4 +1,6 @@
 from datetime import date, datetime
+from io import BytesIO
+from os import SEEK_END
 
 import holidays
 import pandas as pd
@@ -73,10 +75,45 @@ class last:
         return 'UNKNOWN'
 
     @staticmethod
-    def row_date(file: str) -> str:
-        existing_data = pd.read_csv(file)
-        last_date = existing_data.iloc[-1]['Date']
-        return last_date
+    def row(filename: str, block_size: int = 4096, **kwargs) -> pd.DataFrame:
+        """
+        Reads only the header and the last row of a CSV file, seeking the
+        last line from the end of the file, so that the time taken does not
+        depend on the length of the file.
+
+        :param filename: The name of the file to read.
+        :param block_size: The nr. of bytes read back from the end of the
+                           file at a time, until the whole last line is read.
+
+        Additional arguments are passed to pandas.read_csv()
+        :return: A data frame with the last row of the file (empty if it
+                 has only the header).
+        """
+        with open(filename, 'rb') as f:
+            header = f.readline()
+            data_start = f.tell()
+            end = f.seek(0, SEEK_END)
+            start, tail = end, b''
+            while start > data_start and b'\n' not in tail.rstrip(b'\r\n'):
+                start = max(data_start, start - block_size)
+                f.seek(start)
+                tail = f.read(end - start)
+        last_line = tail.rstrip(b'\r\n').rsplit(b'\n', 1)[-1]
+        return pd.read_csv(BytesIO(header + last_line), **kwargs)
+
+    @staticmethod
+    def row_date(file: str, **kwargs):
+        """
+        Returns the date in the last row of the file, reading only that row
+        (see `last.row`).
+
+        Additional arguments are passed to pandas.read_csv()
+        """
+        df = last.row(file, **kwargs)
+        date_column = last.date_colname(df)
+        if date_column is None:
+            raise ValueError('No date column found in file {}'.format(file))
+        return df.iloc[-1][date_column]
 
     # @staticmethod
     # def row_date_is(for_date: str, file: str) -> bool:
@@ -88,7 +125,7 @@ class last:
     def date_is(this_date, filename, **kwargs):
         """
         Checks if last row's date in the file, matches the one passed as
-        first argument.
+        first argument. Only the last row of the file is read.
 
         :param this_date: The date we want to check is present in the last
                             row of the file
@@ -97,12 +134,7 @@ class last:
 
         Additional arguments are passed to pandas.read_csv()
         """
-        df = pd.read_csv(filename, **kwargs)
-        date_column = last.date_colname(df)
-        if date_column is None:
-            raise ValueError('No date column found in file {}'.format(filename))
-        last_date_in_file = df.iloc[-1][date_column]
-        return last_date_in_file == this_date
+        return last.row_date(filename, **kwargs) == this_date
 
     @staticmethod
     def date_colname(df):